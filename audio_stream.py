@@ -0,0 +1,205 @@
+import threading
+import numpy as np
+import speech_recognition as sr
+from pvrecorder import PvRecorder
+
+from stt import frame_energy
+
+# ---------------- CONFIG ----------------
+
+# Porcupine consumes 512-sample frames at 16 kHz
+FRAME_LENGTH = 512
+SAMPLE_WIDTH = 2
+
+# How much history the ring keeps (seconds)
+RING_SECONDS = 30
+
+
+class RingBuffer:
+    """
+    Fixed-size ring of int16 frames with a single writer (the capture thread).
+    Frames are addressed by an absolute, ever-increasing position. The writer
+    copies a frame into its slot before publishing the new write position, so
+    readers never take a lock on the data path; a reader that falls more than
+    a full ring behind simply skips ahead to the oldest frame still held.
+    """
+
+    def __init__(self, capacity, frame_length):
+        self.capacity = capacity
+        self.frame_length = frame_length
+        self.frames = np.zeros((capacity, frame_length), dtype=np.int16)
+        # Frames captured while Jarvis itself was speaking
+        self.gated = np.zeros(capacity, dtype=bool)
+        self.write_pos = 0
+        self.closed = False
+        # Only used to wake up blocked readers, never held while copying
+        self._new_frame = threading.Condition()
+
+    def write(self, frame, gated=False):
+        slot = self.write_pos % self.capacity
+        self.frames[slot] = frame
+        self.gated[slot] = gated
+        self.write_pos += 1
+        with self._new_frame:
+            self._new_frame.notify_all()
+
+    def oldest(self):
+        # The slot of write_pos - capacity is the next one the writer fills,
+        # so it can't be read safely
+        return max(0, self.write_pos - self.capacity + 1)
+
+    def read(self, pos, timeout=None):
+        """
+        Returns (frame, gated, next_pos) for the frame at pos, blocking until
+        it has been captured. Returns (None, False, pos) on timeout or close.
+        """
+        if pos >= self.write_pos:
+            with self._new_frame:
+                if not self._new_frame.wait_for(lambda: pos < self.write_pos or self.closed, timeout):
+                    return None, False, pos
+            if pos >= self.write_pos:
+                return None, False, pos
+
+        pos = max(pos, self.oldest())
+        slot = pos % self.capacity
+        frame = self.frames[slot].copy()
+        gated = bool(self.gated[slot])
+
+        # The writer lapped us while copying; the frame may be torn
+        if self.write_pos - pos >= self.capacity:
+            return self.read(self.oldest(), timeout)
+
+        return frame, gated, pos + 1
+
+    def close(self):
+        self.closed = True
+        with self._new_frame:
+            self._new_frame.notify_all()
+
+
+class MicrophoneStream:
+    """
+    One always-on capture thread that keeps the microphone open and feeds a
+    RingBuffer. Wake word detection and command capture read from the same
+    ring at their own positions, so nothing said after "Jarvis" is lost and
+    the device is never reopened between activations.
+    """
+
+    def __init__(self, frame_length=FRAME_LENGTH, device_index=-1, seconds=RING_SECONDS, gate=None):
+        self.recorder = PvRecorder(device_index=device_index, frame_length=frame_length)
+        self.sample_rate = self.recorder.sample_rate
+        self.frame_length = frame_length
+        capacity = int(seconds * self.sample_rate / frame_length)
+        self.ring = RingBuffer(capacity, frame_length)
+        # gate() -> True while our own TTS is playing (frames get flagged)
+        self.gate = gate
+        self._thread = None
+        self._running = False
+
+    @property
+    def position(self):
+        """Absolute position of the next frame to be captured."""
+        return self.ring.write_pos
+
+    def frames_for(self, seconds):
+        return int(seconds * self.sample_rate / self.frame_length)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self.recorder.start()
+        self._thread = threading.Thread(target=self._capture, name="mic-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+        self.recorder.stop()
+        self.recorder.delete()
+        self.ring.close()
+
+    def reader(self, pos=None, skip_gated=False, echo_level=None):
+        return StreamReader(self, self.position if pos is None else pos, skip_gated, echo_level)
+
+    def _capture(self):
+        while self._running:
+            try:
+                pcm = self.recorder.read()
+            except Exception as e:
+                print(f"❌ Microphone capture error: {e}")
+                break
+            gated = bool(self.gate and self.gate())
+            self.ring.write(np.asarray(pcm, dtype=np.int16), gated)
+        self._running = False
+        self.ring.close()
+
+
+class StreamReader:
+    """
+    A cursor into the shared ring.
+    With skip_gated=True, frames captured while Jarvis was speaking are
+    returned as silence so command capture doesn't transcribe our own voice.
+    If echo_level() is given, only gated frames at or below that energy are
+    muted: louder ones are the user talking over Jarvis and are kept.
+    """
+
+    def __init__(self, stream, pos, skip_gated=False, echo_level=None):
+        self.stream = stream
+        self.pos = pos
+        self.skip_gated = skip_gated
+        self.echo_level = echo_level
+        # Whether the last frame returned was captured during our own playback
+        self.last_gated = False
+        self._leftover = np.zeros(0, dtype=np.int16)
+
+    def read_frame(self, timeout=None):
+        frame, gated, self.pos = self.stream.ring.read(self.pos, timeout)
+        self.last_gated = gated
+        if frame is not None and gated and self.skip_gated:
+            if self.echo_level is None or frame_energy(frame) <= self.echo_level():
+                frame[:] = 0
+        return frame
+
+    def read(self, num_samples, timeout=1.0):
+        """Reads num_samples int16 samples as bytes (speech_recognition stream API)."""
+        parts = [self._leftover]
+        have = self._leftover.size
+        while have < num_samples:
+            frame = self.read_frame(timeout)
+            if frame is None:
+                break
+            parts.append(frame)
+            have += frame.size
+
+        data = np.concatenate(parts)
+        self._leftover = data[num_samples:]
+        return data[:num_samples].tobytes()
+
+    def close(self):
+        pass
+
+
+class RingBufferSource(sr.AudioSource):
+    """
+    speech_recognition AudioSource backed by the shared ring buffer, so
+    Recognizer.listen() works on it exactly as on an sr.Microphone.
+    """
+
+    def __init__(self, stream, pos=None, skip_gated=True, echo_level=None):
+        self.mic_stream = stream
+        self.start_pos = pos
+        self.skip_gated = skip_gated
+        self.echo_level = echo_level
+        self.SAMPLE_RATE = stream.sample_rate
+        self.SAMPLE_WIDTH = SAMPLE_WIDTH
+        self.CHUNK = stream.frame_length
+        self.stream = None
+
+    def __enter__(self):
+        self.stream = self.mic_stream.reader(self.start_pos, self.skip_gated, self.echo_level)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream = None
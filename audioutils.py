@@ -1,16 +1,26 @@
 # audioutils.py
+import threading
+from collections import deque
+from functools import lru_cache
+
 import numpy as np
 from scipy.signal import butter, lfilter
 
-def bandpass_filter(audio, sr):
-    # High-pass @ 80 Hz
-    b_hp, a_hp = butter(2, 80 / (sr / 2), btype="high")
-    audio = lfilter(b_hp, a_hp, audio)
 
+@lru_cache(maxsize=8)
+def filter_coefficients(sr):
+    """Butterworth coefficients, computed once per sample rate."""
+    # High-pass @ 80 Hz
+    highpass = butter(2, 80 / (sr / 2), btype="high")
     # Low-pass @ 7500 Hz
-    b_lp, a_lp = butter(2, 7500 / (sr / 2), btype="low")
-    audio = lfilter(b_lp, a_lp, audio)
+    lowpass = butter(2, 7500 / (sr / 2), btype="low")
+    return highpass, lowpass
 
+
+def bandpass_filter(audio, sr):
+    (b_hp, a_hp), (b_lp, a_lp) = filter_coefficients(sr)
+    audio = lfilter(b_hp, a_hp, audio)
+    audio = lfilter(b_lp, a_lp, audio)
     return audio
 
 
@@ -25,3 +35,80 @@ def preprocess_audio(audio, sr):
     audio = bandpass_filter(audio, sr)
     audio = normalize(audio)
     return audio
+
+
+class StreamingPreprocessor:
+    """
+    Chunked version of preprocess_audio.
+    Filter state is carried across chunks (lfilter zi), so chunk boundaries
+    produce no edge transients, and the gain follows a running RMS instead of
+    re-normalizing each chunk on its own.
+    """
+
+    def __init__(self, sr, target_rms=0.05, smoothing=0.95):
+        (self.b_hp, self.a_hp), (self.b_lp, self.a_lp) = filter_coefficients(sr)
+        self.target_rms = target_rms
+        self.smoothing = smoothing
+        self.reset()
+
+    def reset(self):
+        self._zi_hp = np.zeros(max(len(self.a_hp), len(self.b_hp)) - 1)
+        self._zi_lp = np.zeros(max(len(self.a_lp), len(self.b_lp)) - 1)
+        self._rms = None
+
+    def process(self, chunk):
+        """Filters and levels one float chunk. Returns a new array."""
+        audio, self._zi_hp = lfilter(self.b_hp, self.a_hp, chunk, zi=self._zi_hp)
+        audio, self._zi_lp = lfilter(self.b_lp, self.a_lp, audio, zi=self._zi_lp)
+
+        if audio.size:
+            rms = float(np.sqrt(np.mean(audio ** 2)))
+            if self._rms is None:
+                self._rms = rms
+            else:
+                self._rms = self.smoothing * self._rms + (1 - self.smoothing) * rms
+
+        if self._rms:
+            audio *= self.target_rms / self._rms
+        return audio
+
+
+class NoiseFloorEstimator:
+    """
+    Tracks the ambient energy threshold continuously from idle audio.
+    Keeps a rolling window of per-frame RMS values; frames far above the
+    median (speech, door slams) are rejected via the median absolute
+    deviation before averaging, so the threshold follows the room and not
+    the occasional loud event. Units match Recognizer.energy_threshold.
+    """
+
+    def __init__(self, window_seconds=10.0, frame_seconds=0.032, ratio=1.5,
+                 minimum=50.0, default=200.0, min_frames=30):
+        self._energies = deque(maxlen=int(window_seconds / frame_seconds))
+        self.ratio = ratio  # Same role as Recognizer.dynamic_energy_ratio
+        self.minimum = minimum
+        self.default = default
+        self.min_frames = min_frames
+        self._lock = threading.Lock()
+
+    def update(self, frame):
+        """Adds one int16 frame of idle (non-speech) audio."""
+        samples = np.asarray(frame, dtype=np.float32)
+        if samples.size == 0:
+            return
+        energy = float(np.sqrt(np.mean(samples * samples)))
+        with self._lock:
+            self._energies.append(energy)
+
+    def threshold(self):
+        """Returns the current energy threshold instantly."""
+        with self._lock:
+            if len(self._energies) < self.min_frames:
+                return self.default
+            energies = np.fromiter(self._energies, dtype=np.float32)
+
+        median = np.median(energies)
+        mad = np.median(np.abs(energies - median))
+        # 1.4826 * MAD ~ standard deviation for Gaussian noise
+        inliers = energies[energies <= median + 3.0 * 1.4826 * mad]
+        return max(self.minimum, float(inliers.mean()) * self.ratio)
@@ -0,0 +1,114 @@
+import threading
+
+import tts
+import metrics
+from stt import frame_energy
+
+# ---------------- CONFIG ----------------
+
+# Speech must stay above the trigger level this long to interrupt playback
+BARGE_IN_SECONDS = 0.25
+
+# Our own voice reaches the microphone too. The echo level is learned from
+# the mic energy during playback, and the user has to be this much louder.
+ECHO_RATIO = 2.5
+ECHO_ADAPT = 0.05  # EMA rate of the echo level
+
+# Ignore further triggers this long after an interruption
+COOLDOWN_SECONDS = 1.0
+
+
+class BargeInMonitor:
+    """
+    Watches the shared microphone while Jarvis is talking and interrupts
+    playback (tts.stop()) when the user says the wake word or starts to speak.
+    - Wake word: the Porcupine instance is only free while no wake-word wait
+      is running, so the monitor must be stopped before wait_for_wake_word().
+      Hits are ignored while the sentence being played contains the wake word.
+    - Voice: an energy VAD against an adaptive echo level, so Jarvis's own
+      voice coming back through the speakers doesn't count as the user.
+    Interrupting bumps tts.generation(), which callers use to drop queued
+    speech and cancel in-flight LLM requests.
+    With interrupt=False it only learns the echo level; echo_threshold() is
+    what command capture uses to tell the user's voice from our own.
+    """
+
+    def __init__(self, stream, porcupine=None, energy_threshold=300.0, wake_word="jarvis", interrupt=True):
+        self.stream = stream
+        self.porcupine = porcupine
+        self.interrupt = interrupt
+        self.energy_threshold = energy_threshold
+        self.echo_level = energy_threshold
+        self.wake_word = wake_word.lower()
+        self.interruptions = 0
+
+        self._frames_needed = max(1, stream.frames_for(BARGE_IN_SECONDS))
+        self._cooldown_frames = stream.frames_for(COOLDOWN_SECONDS)
+        self._running = False
+        self._thread = None
+
+    def start(self, energy_threshold=None):
+        if self._running:
+            return
+        if energy_threshold is not None:
+            self.energy_threshold = energy_threshold
+            self.echo_level = max(self.echo_level, energy_threshold)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="barge-in", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def echo_threshold(self):
+        """Mic energy above which a frame during playback counts as the user."""
+        return max(self.energy_threshold, self.echo_level * ECHO_RATIO)
+
+    # ---- Internals ----
+
+    def _run(self):
+        reader = self.stream.reader()
+        loud_frames = 0
+        cooldown = 0
+
+        while self._running:
+            frame = reader.read_frame(timeout=0.5)
+            if frame is None:
+                if self.stream.ring.closed:
+                    return
+                continue
+
+            if cooldown:
+                cooldown -= 1
+                continue
+
+            if not tts.is_speaking():
+                loud_frames = 0
+                continue
+
+            if self.interrupt and self.porcupine is not None and self.porcupine.process(frame) >= 0:
+                if self.wake_word not in (tts.current_text() or "").lower():
+                    self._interrupt("wake word")
+                    cooldown = self._cooldown_frames
+                    continue
+
+            energy = frame_energy(frame)
+            if energy > self.echo_threshold():
+                loud_frames += 1
+            else:
+                loud_frames = 0
+                self.echo_level += ECHO_ADAPT * (energy - self.echo_level)
+
+            if self.interrupt and loud_frames >= self._frames_needed:
+                self._interrupt("voice")
+                loud_frames = 0
+                cooldown = self._cooldown_frames
+
+    def _interrupt(self, reason):
+        print(f"✋ Barge-in ({reason}), stopping playback")
+        self.interruptions += 1
+        metrics.count("barge_ins")
+        tts.stop()
@@ -0,0 +1,318 @@
+"""
+End-to-end latency benchmark for the voice loop, runnable headless and offline.
+
+Stages:
+  stt           transcribe() on recorded WAV fixtures (16 kHz mono int16)
+  llm_speech    time until the streamed "speech" field is handed to TTS
+  llm           full agent response from a local stub Ollama server
+  execute       execute_plan_with_repair() with mocked tools
+  first_audio   STT start -> first chunk reaching the (null) TTS sink
+  end_to_end    STT start -> plan finished and all speech played
+
+Usage:
+  python -m benchmarks.latency --runs 20 --json bench.json
+  python -m benchmarks.latency --fixtures benchmarks/fixtures --whisper tiny.en
+
+Fixtures: every NAME.wav in --fixtures is transcribed. Without fixtures (or
+with --skip-stt) the built-in COMMANDS are used as transcripts.
+"""
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# wake.py refuses to import without a key; the benchmark never touches Porcupine
+os.environ.setdefault("PICOVOICE_ACCESS_KEY", "benchmark")
+
+import main
+import stt
+import tts
+from plan_cache import PlanCache
+from ollama_client import OllamaClient
+from tools import registry
+
+# ---------------- CONFIG ----------------
+
+COMMANDS = [
+    "what's the weather like in london and what time is it",
+    "open firefox and search for python tutorials",
+    "what do you remember about my dog",
+]
+
+# Canned agent responses, served in rotation by the stub LLM
+AGENT_RESPONSES = [
+    {
+        "intent": "respond_and_act",
+        "speech": "Let me check the weather and the time.",
+        "plan": [
+            {"tool": "search_web", "args": {"query": "weather london"}, "description": "Search weather"},
+            {"tool": "get_time", "args": {}, "description": "Get time"},
+        ],
+        "confidence": 0.9,
+    },
+    {
+        "intent": "act",
+        "speech": "Opening Firefox and searching.",
+        "plan": [
+            {"tool": "open_app", "args": {"app_name": "firefox"}, "description": "Open Firefox"},
+            {"tool": "search_web", "args": {"query": "python tutorials"}, "description": "Search"},
+        ],
+        "confidence": 0.9,
+    },
+    {
+        "intent": "respond_and_act",
+        "speech": "Let me think.",
+        "plan": [
+            {"tool": "retrieve_memory", "args": {"query": "dog"}, "description": "Recall dog"},
+        ],
+        "confidence": 0.9,
+    },
+]
+
+SUMMARY_RESPONSE = "Here is what I found. Everything looks good."
+
+# ---------------- STUB OLLAMA ----------------
+
+class StubOllama:
+    """Local /api/generate stand-in streaming canned responses token by token."""
+
+    def __init__(self, token_delay=0.005, chars_per_token=4):
+        self.token_delay = token_delay
+        self.chars_per_token = chars_per_token
+        self.counter = 0
+        self.lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.handle(self, body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.host = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def next_response(self, body):
+        if body.get("format") != "json":
+            return SUMMARY_RESPONSE
+        with self.lock:
+            response = AGENT_RESPONSES[self.counter % len(AGENT_RESPONSES)]
+            self.counter += 1
+        return json.dumps(response)
+
+    def handle(self, request, body):
+        # Model preload
+        if "prompt" not in body:
+            self.send_json(request, {"response": "", "done": True})
+            return
+
+        text = self.next_response(body)
+        stats = {"done": True, "prompt_eval_count": 1, "prompt_eval_duration": 0,
+                 "eval_count": len(text) // self.chars_per_token, "eval_duration": 0, "total_duration": 0}
+
+        if not body.get("stream"):
+            time.sleep(self.token_delay * len(text) / self.chars_per_token)
+            self.send_json(request, {"response": text, **stats})
+            return
+
+        request.send_response(200)
+        request.send_header("Content-Type", "application/x-ndjson")
+        request.end_headers()
+        for i in range(0, len(text), self.chars_per_token):
+            time.sleep(self.token_delay)
+            chunk = {"response": text[i:i + self.chars_per_token], "done": False}
+            request.wfile.write((json.dumps(chunk) + "\n").encode())
+            request.wfile.flush()
+        request.wfile.write((json.dumps({"response": "", **stats}) + "\n").encode())
+
+    @staticmethod
+    def send_json(request, data):
+        payload = json.dumps(data).encode()
+        request.send_response(200)
+        request.send_header("Content-Length", str(len(payload)))
+        request.end_headers()
+        request.wfile.write(payload)
+
+    def close(self):
+        self.server.shutdown()
+
+# ---------------- NULL TTS ----------------
+
+class NullSynthesizer:
+    sample_rate = 22050
+
+    def synthesize(self, text):
+        return b"\0\0" * 10
+
+class NullPlayer:
+    """Records when audio would have started playing."""
+
+    def __init__(self):
+        self.first_play = None
+
+    def play(self, pcm, is_current=None):
+        if self.first_play is None:
+            self.first_play = time.perf_counter()
+
+# ---------------- MOCK TOOLS ----------------
+
+def install_mock_tools(delay):
+    def mock(name):
+        def tool(**kwargs):
+            time.sleep(delay)
+            return f"{name} ok"
+        return tool
+
+    for name in registry.TOOLS:
+        registry.TOOLS[name] = mock(name)
+
+# ---------------- FIXTURES ----------------
+
+def load_fixtures(directory):
+    """Returns [(name, float32 pcm)] for each 16 kHz mono int16 WAV."""
+    fixtures = []
+    if not os.path.isdir(directory):
+        return fixtures
+
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".wav"):
+            continue
+        path = os.path.join(directory, filename)
+        with wave.open(path, "rb") as w:
+            if (w.getframerate(), w.getnchannels(), w.getsampwidth()) != (stt.SAMPLE_RATE, 1, stt.SAMPLE_WIDTH):
+                raise SystemExit(f"{path}: expected {stt.SAMPLE_RATE} Hz mono 16-bit PCM")
+            fixtures.append((filename, stt.pcm_to_float32(w.readframes(w.getnframes()))))
+    return fixtures
+
+# ---------------- RUN ----------------
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    k = (len(ordered) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+def run_once(text_or_pcm, whisper, player):
+    timings = {}
+    player.first_play = None
+
+    start = time.perf_counter()
+    if whisper is not None:
+        text, _ = stt.transcribe_pcm(text_or_pcm, whisper)
+        text = text or COMMANDS[0]
+        timings["stt"] = time.perf_counter() - start
+    else:
+        text = text_or_pcm
+
+    llm_start = time.perf_counter()
+    spoke = []
+
+    def on_speech(speech):
+        spoke.append(time.perf_counter())
+        tts.say(speech)
+
+    response = main.ask_llm(text, on_speech=on_speech)
+    timings["llm"] = time.perf_counter() - llm_start
+    if spoke:
+        timings["llm_speech"] = spoke[0] - llm_start
+
+    result = json.loads(response)
+    if not spoke and result.get("speech"):
+        tts.say(result["speech"])
+    tts.wait()
+
+    exec_start = time.perf_counter()
+    if result.get("plan"):
+        main.execute_plan_with_repair(result["plan"], text)
+    tts.wait()
+    end = time.perf_counter()
+
+    timings["execute"] = end - exec_start
+    if player.first_play is not None:
+        timings["first_audio"] = player.first_play - start
+    timings["end_to_end"] = end - start
+    return timings
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Jarvis voice-loop latency benchmark")
+    parser.add_argument("--runs", type=int, default=10, help="Repetitions per fixture/command")
+    parser.add_argument("--fixtures", default=os.path.join(os.path.dirname(__file__), "fixtures"))
+    parser.add_argument("--whisper", default="tiny.en", help="faster-whisper model name or local path")
+    parser.add_argument("--skip-stt", action="store_true", help="Use text commands instead of WAV fixtures")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Stub LLM seconds per token")
+    parser.add_argument("--tool-delay", type=float, default=0.01, help="Mocked tool latency (seconds)")
+    parser.add_argument("--json", dest="json_path", help="Write machine-readable results here")
+    args = parser.parse_args()
+
+    # Local stand-ins: stub LLM, mocked tools, null TTS, throwaway plan cache
+    stub = StubOllama(token_delay=args.token_delay)
+    main.llm = OllamaClient(main.OLLAMA_MODEL, stub.host, keep_alive=main.OLLAMA_KEEP_ALIVE)
+    cache_dir = tempfile.TemporaryDirectory(prefix="jarvis-bench-")
+    main.plan_cache = PlanCache(path=os.path.join(cache_dir.name, "plan_cache.json"))
+    install_mock_tools(args.tool_delay)
+    player = NullPlayer()
+    tts.set_engine(tts.TTSEngine(NullSynthesizer(), player))
+
+    inputs = [] if args.skip_stt else load_fixtures(args.fixtures)
+    whisper = None
+    if inputs:
+        from faster_whisper import WhisperModel
+        whisper = WhisperModel(args.whisper, device="cpu", compute_type="int8")
+    else:
+        print("ℹ️ No WAV fixtures, benchmarking from text commands (STT stage skipped)")
+        inputs = [(command, command) for command in COMMANDS]
+
+    samples = {}
+    for run in range(args.runs):
+        for name, data in inputs:
+            for stage, seconds in run_once(data, whisper, player).items():
+                samples.setdefault(stage, []).append(seconds * 1000)
+
+    stages = {
+        stage: {
+            "n": len(values),
+            "p50_ms": round(percentile(values, 0.50), 2),
+            "p95_ms": round(percentile(values, 0.95), 2),
+            "mean_ms": round(sum(values) / len(values), 2),
+        }
+        for stage, values in samples.items()
+    }
+
+    print(f"\n{'stage':<12} {'n':>5} {'p50 ms':>10} {'p95 ms':>10}")
+    for stage, row in stages.items():
+        print(f"{stage:<12} {row['n']:>5} {row['p50_ms']:>10.1f} {row['p95_ms']:>10.1f}")
+
+    if args.json_path:
+        report = {
+            "commit": git_commit(),
+            "timestamp": time.time(),
+            "config": {k: v for k, v in vars(args).items() if k != "json_path"},
+            "stages": stages,
+        }
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Results written to {args.json_path}")
+
+    tts.shutdown()
+    stub.close()
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
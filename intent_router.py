@@ -0,0 +1,90 @@
+import re
+
+from tools.app_scanner import match_app_name
+
+# ---------------- CONFIG ----------------
+
+# Routed intents below this confidence go to the LLM instead
+FAST_PATH_MIN_CONFIDENCE = 0.85
+
+# App names must match this closely (0-100) to skip the LLM, and beat the
+# next closest name by APP_MATCH_MIN_LEAD; ambiguous names go to the LLM
+APP_MATCH_MIN_SCORE = 90
+APP_MATCH_MIN_LEAD = 5
+
+FILLER = re.compile(r"^(?:(?:hey |ok |okay )?jarvis,? )?(?:please |can you |could you )?|(?: please| for me| now)$")
+
+RULES = [
+    (
+        re.compile(r"^(?:set |change |turn |put )?(?:the )?(?:volume|sound) (?:to |at )?(\d{1,3})(?: ?%| percent)?$"),
+        lambda m: ("set_volume", {"level": min(100, int(m.group(1)))}),
+    ),
+    (
+        re.compile(r"^(?:mute|silence)(?: (?:the )?(?:volume|sound|audio|speakers?))?$"),
+        lambda m: ("mute", {}),
+    ),
+    (
+        re.compile(r"^unmute(?: (?:the )?(?:volume|sound|audio|speakers?))?$"),
+        lambda m: ("unmute", {}),
+    ),
+    (
+        re.compile(
+            r"^(?:what(?:'s| is) the (?:time|date)(?: now| today)?"
+            r"|what time is it(?: now)?"
+            r"|(?:tell me )?the time"
+            r"|what day is (?:it|today))$"
+        ),
+        lambda m: ("get_time", {}),
+    ),
+]
+
+OPEN_APP = re.compile(r"^(?:open|launch|start|run) (?:up )?(?:the )?(?:app(?:lication)? )?(.+?)(?: app(?:lication)?)?$")
+
+# Spoken replies, given the tool's args and result (None = say nothing)
+REPLIES = {
+    "set_volume": lambda args, result: f"Volume set to {args['level']} percent.",
+    # Played through the sink that was just muted, so nobody would hear it
+    "mute": lambda args, result: None,
+    "unmute": lambda args, result: "Unmuted.",
+    "get_time": lambda args, result: f"It's {result}.",
+    "open_app": lambda args, result: f"Opening {args['app_name']}.",
+}
+
+
+def normalize(text):
+    """Lowercases and strips punctuation and filler words from a transcript."""
+    text = text.lower().strip()
+    text = re.sub(r"[^\w\s'%]", " ", text)
+    text = " ".join(text.split())
+    return FILLER.sub("", text).strip()
+
+
+def route_intent(text):
+    """
+    Deterministic fast path in front of the LLM.
+    Returns {"tool", "args", "confidence", "reply"} for commands that can be
+    executed directly, or None to fall through to the LLM.
+    """
+    command = normalize(text)
+    if not command:
+        return None
+
+    for pattern, build in RULES:
+        m = pattern.match(command)
+        if m:
+            tool, args = build(m)
+            return _intent(tool, args, 1.0)
+
+    m = OPEN_APP.match(command)
+    if m:
+        app, score, runner_up = match_app_name(m.group(1))
+        if app and score >= APP_MATCH_MIN_SCORE and score - runner_up >= APP_MATCH_MIN_LEAD:
+            return _intent("open_app", {"app_name": app["name"]}, score / 100.0)
+
+    return None
+
+
+def _intent(tool, args, confidence):
+    if confidence < FAST_PATH_MIN_CONFIDENCE:
+        return None
+    return {"tool": tool, "args": args, "confidence": confidence, "reply": REPLIES[tool]}
@@ -1,24 +1,65 @@
-import os
+import re
+import sys
 import time
 import json
 import gc
+from concurrent.futures import ThreadPoolExecutor
 import speech_recognition as sr
 from faster_whisper import WhisperModel
 import requests
-import tempfile
-import subprocess
-import soundfile as sf
-import numpy as np
 
-from wake import wait_for_wake_word, init_wake_word_engine
-from tools.registry import TOOLS, TOOL_DEFINITIONS, execute_tool_safely
+import tts
+import metrics
+from ollama_client import OllamaClient, GenerationCancelled
+from audioutils import NoiseFloorEstimator
+from audio_stream import MicrophoneStream, RingBufferSource
+from stt import (
+    SAMPLE_WIDTH, FAST_DECODE_OPTIONS, ESCALATE_BELOW_CONFIDENCE, ESCALATE_ABOVE_NO_SPEECH,
+    transcribe, check_audio_format, StreamingTranscriber, CascadeTranscriber
+)
+from startup import warm_up
+from pipeline import VoicePipeline
+from barge_in import BargeInMonitor
+from intent_router import route_intent
+from plan_cache import PlanCache
+from wake import wait_for_wake_word, init_wake_word_engine, WAKE_ACK
+from tools.registry import TOOLS, TOOL_DEFINITIONS, execute_tool_safely, prewarm_tools, load_tool_module
+from tools.app_scanner import watch_apps
 
 # ---------------- CONFIG ----------------
 
-SAMPLE_RATE = 16000
-
 OLLAMA_MODEL = "qwen2.5:3b-instruct"
-OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_HOST = "http://localhost:11434"
+# How long Ollama keeps the model loaded after the last request
+OLLAMA_KEEP_ALIVE = "30m"
+
+# Stream tokens from Ollama so the "speech" field can be spoken while the
+# "plan" is still being generated. Set to False to use the blocking request.
+LLM_STREAMING = True
+
+# Decode speech in chunks while the user talks and finalize on a short VAD
+# endpoint, instead of waiting for pause_threshold and decoding once.
+STREAMING_STT = True
+
+WHISPER_MODEL = "medium.en"
+# Small model tried first; medium.en only runs when it isn't confident.
+# Set to None to always decode with WHISPER_MODEL.
+FAST_WHISPER_MODEL = "base.en"
+
+# Run each chat session as concurrent asyncio stages (see pipeline.py): the
+# preamble plays while the plan executes and listening never stops.
+# Set to False for the sequential listen -> think -> speak -> act loop.
+ASYNC_PIPELINE = True
+
+# Stop talking when the user says "Jarvis" or starts speaking over us
+BARGE_IN = True
+
+INACTIVITY_LIMIT = 300
+
+# RELAXED CONFIDENCE THRESHOLDS (Production-Grade)
+HIGH_CONFIDENCE = 0.60
+MEDIUM_CONFIDENCE = 0.40
+LOW_CONFIDENCE = 0.25
 
 # Dynamically inject tool definitions
 # NOTE: TOOL_DEFINITIONS is imported from tools.registry at the top of the file.
@@ -60,8 +101,18 @@ Rules:
 - MEMORY: If the user states a preference or fact, use 'store_memory'. If you need to recall something, use 'retrieve_memory'.
 """
 
-PIPER_EXE = "./piper_bin/piper/piper"
-PIPER_MODEL = "voices/ryan-med/en_US-ryan-medium.onnx"
+# Fixed phrases, pre-synthesized into the TTS phrase cache at startup
+CANNED_PHRASES = [
+    WAKE_ACK,
+    "Done.",
+    "Adapting my plan.",
+    "I am going to sleep now.",
+    "I am stuck and cannot fix the plan. Please help.",
+    "I couldn't figure out how to fix it.",
+    "I'm having trouble structuring my thoughts.",
+    "I found the information but couldn't summarize it.",
+    "Unmuted.",
+]
 
 # ---------------- AUDIO ----------------
 
@@ -79,102 +130,153 @@ def listen_for_command(recognizer, source, timeout=None):
         print(" " * 40, end="\r")
         raise
 
-# ---------------- STT ----------------
+def listen_streaming(source, transcriber, timeout=None):
+    """
+    Feeds microphone chunks into a StreamingTranscriber until it reaches
+    an endpoint. Raises sr.WaitTimeoutError if no speech starts in time.
+    Returns: (text or None, confidence)
+    """
+    print("🎙️ Listening for command...", end="\r")
+    transcriber.reset()
+    seconds_per_chunk = source.CHUNK / source.SAMPLE_RATE
+    waited = 0.0
+
+    while True:
+        read_started = time.monotonic()
+        chunk = source.stream.read(source.CHUNK)
+        if chunk:
+            result = transcriber.feed(chunk)
+            if result is not None:
+                print(" " * 80, end="\r")
+                return result
+            if not transcriber.started:
+                waited += seconds_per_chunk
+        else:
+            # The read timed out, or capture died and closed the ring
+            if source.mic_stream.ring.closed:
+                raise RuntimeError("Microphone stream stopped")
+            waited += time.monotonic() - read_started
+
+        if not transcriber.started and timeout and waited > timeout:
+            print(" " * 40, end="\r")
+            raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+
+def show_partial(text):
+    print(f"💬 {text[-70:]}".ljust(80), end="\r")
+
+# ---------------- LLM ----------------
 
-def transcribe(audio_data, model):
-    pcm = np.frombuffer(audio_data.get_raw_data(), dtype=np.int16).astype(np.float32)
-    pcm /= 32768.0 
+# Shared client: pooled keep-alive session, model kept loaded between turns
+llm = OllamaClient(OLLAMA_MODEL, OLLAMA_HOST, keep_alive=OLLAMA_KEEP_ALIVE)
 
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-        sf.write(f.name, pcm, SAMPLE_RATE)
-        wav_path = f.name
+def ask_llm(text, system_prompt=AGENT_SYSTEM_PROMPT, json_format=True, on_speech=None, cancel=None):
+    """
+    Sends a prompt to Ollama and returns the raw response text.
+    If on_speech is given (and LLM_STREAMING is enabled), the response is
+    streamed and on_speech(speech) fires as soon as the "speech" field of the
+    agent JSON is complete, before the rest of the document arrives.
+    Raises GenerationCancelled once cancel() returns True (see interruption_check).
+    """
+    if on_speech and LLM_STREAMING:
+        streamed = ask_llm_stream(text, on_speech, system_prompt, json_format, cancel)
+        if streamed is not None:
+            return streamed
+        print("⚠️ Streaming failed, falling back to blocking request")
 
     try:
-        # Tuned parameters for Medium INT8
-        segments, info = model.transcribe(
-            wav_path,
-            beam_size=7,
-            temperature=0.0,
-            condition_on_previous_text=False,
-            vad_filter=True,
-            no_speech_threshold=0.6,
-            log_prob_threshold=-1.0
-        )
+        return llm.generate(text, system_prompt, json_format, cancel=cancel).strip()
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        print(f"❌ LLM Error: {e}")
+        return None
 
-        texts = []
-        logprobs = []
-        no_speech_probs = []
+def preload_llm():
+    """Asks Ollama to load the model now so the first query doesn't pay for it."""
+    llm.preload()
 
-        for seg in segments:
-            texts.append(seg.text.strip())
-            logprobs.append(seg.avg_logprob)
-            no_speech_probs.append(seg.no_speech_prob)
+SPEECH_KEY = re.compile(r'"speech"\s*:\s*')
 
-        final_text = " ".join(texts).strip()
-        
-        # Hallucination Guard
-        hallucinations = {
-            "you", "thank you", "thanks",
-            "subtitles by", "amara.org", "mbc"
-        }
-        if final_text.lower().strip(".,!?") in hallucinations:
-             return None, 0.0
+class SpeechFieldExtractor:
+    """
+    Incrementally scans a streamed agent JSON document and reports the
+    "speech" value as soon as its closing quote has arrived.
+    """
 
-        # ---- CONFIDENCE GATING ----
-        if not final_text or not logprobs:
-            return None, 0.0
+    def __init__(self):
+        self.buffer = ""
+        self.done = False
 
-        avg_logprob = sum(logprobs) / len(logprobs)
-        max_no_speech = max(no_speech_probs)
+    def feed(self, chunk):
+        """Appends a chunk. Returns the speech string exactly once, when complete."""
+        self.buffer += chunk
+        if self.done:
+            return None
 
-        # Normalize logprob to roughly 0-1 scale (heuristic)
-        # logprob 0 = 100%, -1 = 37%, -2 = 13%
-        # Simple clamp: max(0, (logprob + 1.0))
-        confidence = max(0.0, min(1.0, (avg_logprob + 1.0)))
+        match = SPEECH_KEY.search(self.buffer)
+        if not match or match.end() >= len(self.buffer):
+            return None
 
-        # Reject if likely noise or very low confidence
-        # -0.7 is roughly 50% confidence
-        if avg_logprob < -0.7 or max_no_speech > 0.6:
-            return None, confidence
+        start = match.end()
+        if self.buffer[start] != '"':
+            # null (or malformed): nothing to speak early
+            self.done = True
+            return None
 
-        return final_text, confidence
+        try:
+            speech, _ = json.decoder.scanstring(self.buffer, start + 1)
+        except json.JSONDecodeError:
+            return None  # String not terminated yet
 
-    finally:
-        if os.path.exists(wav_path):
-            os.remove(wav_path)
+        self.done = True
+        return speech
 
-# ---------------- LLM ----------------
+def ask_llm_stream(text, on_speech, system_prompt=AGENT_SYSTEM_PROMPT, json_format=True, cancel=None):
+    """
+    Streams Ollama's NDJSON chunks. Returns the full response text, or None
+    if the request failed before any speech was handed to on_speech.
+    """
+    extractor = SpeechFieldExtractor()
+    spoke = False
+
+    def on_token(token):
+        nonlocal spoke
+        speech = extractor.feed(token)
+        if speech:
+            spoke = True
+            on_speech(speech)
 
-def ask_llm(text, system_prompt=AGENT_SYSTEM_PROMPT, json_format=True):
-    payload = {
-        "model": OLLAMA_MODEL,
-        "prompt": text,
-        "system": system_prompt,
-        "stream": False,
-    }
-    if json_format:
-        payload["format"] = "json"
-        
     try:
-        r = requests.post(OLLAMA_URL, json=payload, timeout=60)
-        r.raise_for_status()
-        return r.json()["response"].strip()
-    except requests.exceptions.RequestException as e:
-        print(f"❌ LLM Error: {e}")
+        llm.generate(text, system_prompt, json_format, on_token=on_token, cancel=cancel)
+        return extractor.buffer.strip()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"❌ LLM Stream Error: {e}")
+        if spoke:
+            # Speech already went out; a blocking retry would repeat it
+            return extractor.buffer.strip() or None
         return None
 
 # ---------------- PIPER ----------------
 
-def speak(text):
+def speak(text, wait=True):
+    """
+    Speaks text through the persistent Piper engine (see tts.py).
+    With wait=False the text is queued and playback happens in the background.
+    Phrases listed in CANNED_PHRASES are served from the phrase cache.
+    """
     if not text:
         return
     print("🗣️ Jarvis:", text)
-    cmd = (
-        f'echo "{text}" | {PIPER_EXE} '
-        f'--model {PIPER_MODEL} --output_raw | '
-        'aplay -r 22050 -f S16_LE -t raw -'
-    )
-    subprocess.run(cmd, shell=True, check=True)
+    if wait:
+        tts.speak(text, cache=text in CANNED_PHRASES)
+    else:
+        tts.say(text, cache=text in CANNED_PHRASES)
+
+def interruption_check():
+    """
+    Returns a callable that turns True once playback has been interrupted
+    (barge-in) after this call. Used to drop work the user talked over.
+    """
+    generation = tts.generation()
+    return lambda: tts.generation() != generation
 
 # ---------------- PLAN REPAIR & EXECUTION ----------------
 
@@ -183,8 +285,62 @@ DATA_TOOLS = {
     "list_files", "system_status", "get_time"
 }
 
-def request_plan_repair(user_goal, plan_state):
+def embed_command(text):
+    """Embeds with the memory model, but only if it's already loaded."""
+    # The module may still be importing on the prewarm thread
+    embeddings = getattr(sys.modules.get("tools.memory"), "embeddings", None)
+    if embeddings is None:
+        return None
+    return embeddings.encode(text)
+
+def memory_consolidator():
+    """The memory clean-up job, if the memory module has been loaded."""
+    return getattr(sys.modules.get("tools.memory"), "consolidator", None)
+
+# Plans for repeated commands; near-duplicates only reuse read-only plans
+plan_cache = PlanCache(embed=embed_command, safe_tools=DATA_TOOLS)
+
+# Independent data-retrieval steps run concurrently on this pool
+PLAN_WORKERS = 4
+plan_pool = ThreadPoolExecutor(max_workers=PLAN_WORKERS, thread_name_prefix="plan")
+
+def build_plan_stages(plan):
+    """
+    Flattens the plan's dependency graph into stages of step indices.
+    A side-effecting step depends on every step before it; a data step
+    (DATA_TOOLS) depends only on the last side-effecting step before it.
+    So runs of consecutive data steps form one concurrent stage, while
+    side-effecting steps run alone and keep their order.
+    """
+    stages = []
+    for i, step in enumerate(plan):
+        is_data = step.get("tool") in DATA_TOOLS
+        if is_data and stages and stages[-1]["data"]:
+            stages[-1]["steps"].append(i)
+        else:
+            stages.append({"data": is_data, "steps": [i]})
+    return [stage["steps"] for stage in stages]
+
+def run_plan_stage(plan, indices):
+    """Executes one stage. Returns results in step order."""
+    for i in indices:
+        step = plan[i]
+        print(f"▶️ Step {i+1}: {step.get('description', step.get('tool'))}")
+
+    if len(indices) == 1:
+        step = plan[indices[0]]
+        return [execute_tool_safely(step.get("tool"), step.get("args", {}))]
+
+    print(f"⏩ Running steps {', '.join(str(i + 1) for i in indices)} concurrently")
+    futures = [
+        plan_pool.submit(execute_tool_safely, plan[i].get("tool"), plan[i].get("args", {}))
+        for i in indices
+    ]
+    return [f.result() for f in futures]
+
+def request_plan_repair(user_goal, plan_state, cancel=None):
     print(f"🔧 Attempting Plan Repair (Attempt {plan_state.get('repair_attempts', 0) + 1})")
+    metrics.count("repairs")
     
     prompt = f"""
 The original user request was:
@@ -201,17 +357,23 @@ Do not blindly retry the exact same failing step without changing arguments.
 If repair is impossible, return a plan with null.
 """
     
-    response = ask_llm(prompt)
+    try:
+        with metrics.span("llm.repair"):
+            response = ask_llm(prompt, cancel=cancel)
+    except GenerationCancelled:
+        return None
     if response:
         try:
             return json.loads(response).get("plan")
         except:
+            metrics.count("json_parse_failures")
             return None
     return None
 
-def generate_final_response(user_text, observations):
+def generate_final_response(user_text, observations, cancel=None):
     """
     Asks the LLM to synthesize tool outputs into a natural response.
+    Returns None if cancelled.
     """
     prompt = f"""
 User Request: "{user_text}"
@@ -223,14 +385,21 @@ Please provide a concise, natural response to the user based on this information
 Do not mention "I used a tool" or "The system returned". Just answer the question or confirm the status.
 """
     # Request plain text for the summary, not JSON
-    response = ask_llm(prompt, system_prompt="You are Jarvis. Summarize the information helpfully.", json_format=False)
+    try:
+        with metrics.span("llm.summary"):
+            response = ask_llm(prompt, system_prompt="You are Jarvis. Summarize the information helpfully.",
+                               json_format=False, cancel=cancel)
+    except GenerationCancelled:
+        return None
     
     if response:
         return response
     return "I found the information but couldn't summarize it."
 
-def execute_plan_with_repair(plan, original_user_text, repair_depth=0):
+def execute_plan_with_repair(plan, original_user_text, repair_depth=0, interrupted=None):
     MAX_REPAIRS = 2
+    # Once the user talks over us, finish the tools but skip the LLM follow-ups
+    interrupted = interrupted or interruption_check()
     
     if repair_depth > MAX_REPAIRS:
         speak("I am stuck and cannot fix the plan. Please help.")
@@ -245,85 +414,296 @@ def execute_plan_with_repair(plan, original_user_text, repair_depth=0):
     
     observations = []
 
-    for i, step in enumerate(plan):
-        plan_state["current_step"] = i + 1
-        tool_name = step.get("tool")
-        args = step.get("args", {})
-        description = step.get("description", tool_name)
-
-        print(f"▶️ Step {i+1}: {description}")
-        
-        # Execute Safe
-        result = execute_tool_safely(tool_name, args)
-
-        plan_state["history"].append({
-            "step": step,
-            "result": result
-        })
-
-        # ---- FAILURE DETECTED ----
-        if result.get("status") == "error":
-            print(f"❌ Step Failed: {result.get('error')}")
-            speak(f"I ran into an issue with {description}.")
+    for indices in build_plan_stages(plan):
+        with metrics.span("plan.stage", steps=len(indices)):
+            results = run_plan_stage(plan, indices)
+
+        for i, result in zip(indices, results):
+            plan_state["history"].append({
+                "step": plan[i],
+                "result": result
+            })
+
+        for i, result in zip(indices, results):
+            plan_state["current_step"] = i + 1
+            step = plan[i]
+            tool_name = step.get("tool")
+            description = step.get("description", tool_name)
+
+            # ---- FAILURE DETECTED ----
+            if result.get("status") == "error":
+                print(f"❌ Step Failed: {result.get('error')}")
+                plan_cache.invalidate(original_user_text)
+                speak(f"I ran into an issue with {description}.")
+                
+                repaired_plan = request_plan_repair(original_user_text, plan_state, cancel=interrupted)
+
+                if interrupted():
+                    print("✋ Interrupted, dropping plan repair")
+                elif repaired_plan:
+                    speak("Adapting my plan.")
+                    execute_plan_with_repair(repaired_plan, original_user_text, repair_depth + 1, interrupted)
+                else:
+                    speak("I couldn't figure out how to fix it.")
+                
+                return # Stop this execution branch
             
-            repaired_plan = request_plan_repair(original_user_text, plan_state)
-
-            if repaired_plan:
-                speak("Adapting my plan.")
-                execute_plan_with_repair(repaired_plan, original_user_text, repair_depth + 1)
-            else:
-                speak("I couldn't figure out how to fix it.")
-            
-            return # Stop this execution branch
-        
-        # ---- DATA COLLECTION ----
-        # If the tool is a data-retrieval tool, save the result
-        if tool_name in DATA_TOOLS and result.get("status") == "ok":
-            output = result.get("result")
-            observations.append(f"Tool '{tool_name}' output: {output}")
-
-        time.sleep(0.5)
+            # ---- DATA COLLECTION ----
+            # If the tool is a data-retrieval tool, save the result
+            if tool_name in DATA_TOOLS and result.get("status") == "ok":
+                output = result.get("result")
+                observations.append(f"Tool '{tool_name}' output: {output}")
 
     # After plan finishes, if we have observations, summarize them
     if observations:
         print("📝 Synthesizing answer from tool outputs...")
-        final_answer = generate_final_response(original_user_text, "\n".join(observations))
+        final_answer = generate_final_response(original_user_text, "\n".join(observations), cancel=interrupted)
+        if interrupted():
+            print("✋ Interrupted, dropping summary")
+            return
         speak(final_answer)
     else:
         speak("Done.")
 
-# ---------------- MAIN LOOP ----------------
+# ---------------- FAST PATH ----------------
 
-def main():
-    print("🧠 Loading models...")
+def run_fast_intent(intent):
+    """
+    Executes a routed intent directly, skipping the LLM.
+    Returns False if the tool failed, so the caller can fall back to the LLM.
+    """
+    print(f"⚡ Fast path: {intent['tool']}({intent['args']})")
+    result = execute_tool_safely(intent["tool"], intent["args"])
+    if result.get("status") != "ok":
+        print(f"❌ Fast path failed: {result.get('error')}")
+        return False
+    speak(intent["reply"](intent["args"], result.get("result")))
+    return True
 
-    whisper_model = None
-    wake_model = None
+# ---------------- COMMAND HANDLING ----------------
+
+def capture_command(source, transcriber, recognizer, stt_engine, timeout=5):
+    """
+    Listens for one command on the shared microphone.
+    Returns (text, confidence), or None on timeout, silence or noise.
+    """
+    try:
+        with metrics.span("listen"):
+            if STREAMING_STT:
+                text, confidence = listen_streaming(source, transcriber, timeout=timeout)
+            else:
+                audio = listen_for_command(recognizer, source, timeout=timeout)
+                text, confidence = transcribe(audio, stt_engine)
+    except sr.WaitTimeoutError:
+        return None
+
+    if not text or confidence < LOW_CONFIDENCE:
+        # Too low confidence or silence (Noise)
+        if confidence > 0:
+            print(f"🔇 Ignored noise/low confidence ({confidence:.2f})...")
+            metrics.count("low_confidence_drops")
+        return None
+
+    print(f"👤 You ({confidence:.2f}): {text}")
+    return text, confidence
+
+def plan_command(text, confidence):
+    """
+    Decides what to do with a command: fast path, cached plan or the LLM.
+    Spoken replies are queued on the TTS engine, not waited for.
+    Returns the plan to execute, or None if there is nothing left to do.
+    """
+    # --- CONFIDENCE ROUTING ---
+
+    # 1. Medium Confidence: Confirm with user (Soft check)
+    if confidence < HIGH_CONFIDENCE:
+        print(f"⚠️ Confidence {confidence:.2f} < {HIGH_CONFIDENCE}. Soft confirmation.")
+        speak(f"Okay, {text}.", wait=False) # Acknowledge but proceed cautiously or confirm
+
+    # 2. Simple commands: deterministic fast path, no LLM round trip
+    intent = route_intent(text)
+    if intent and run_fast_intent(intent):
+        metrics.count("fast_path_hits")
+        return None
+
+    # 3. Repeated commands: reuse the plan generated last time
+    cached = plan_cache.get(text)
+    if cached:
+        print("🗂️ Plan cache hit")
+        metrics.count("plan_cache_hits")
+        speak(cached.get("speech"), wait=False)
+        return cached["plan"]
+
+    # 4. High Confidence (or Medium Proceed): ask the LLM
+    # Speech is spoken as soon as it streams in, while the plan is still generating
+    early_speech = []
+    interrupted = interruption_check()
+
+    def on_speech(speech):
+        early_speech.append(speech)
+        speak(speech, wait=False)
 
-    # Load Faster-Whisper ONCE
     try:
-        whisper_model = WhisperModel(
-            "medium.en",
+        with metrics.span("llm") as span:
+            response_json = ask_llm(text, on_speech=on_speech, cancel=interrupted)
+            span.set(early_speech=bool(early_speech))
+    except GenerationCancelled:
+        print("✋ Interrupted, dropping response")
+        return None
+    print(llm.format_stats())
+
+    if not response_json or interrupted():
+        return None
+
+    try:
+        result = json.loads(response_json)
+    except json.JSONDecodeError:
+        print(f"❌ Failed to parse JSON: {response_json}")
+        metrics.count("json_parse_failures")
+        speak("I'm having trouble structuring my thoughts.")
+        return None
+
+    if not early_speech:
+        speak(result.get("speech"), wait=False)
+
+    plan = result.get("plan")
+    if plan:
+        plan_cache.put(text, result)
+    return plan
+
+def execute_command(text, plan):
+    with metrics.span("execute", steps=len(plan)):
+        execute_plan_with_repair(plan, text)
+
+# ---------------- MAIN LOOP ----------------
+
+def load_whisper(name):
+    try:
+        model = WhisperModel(
+            name,
             device="cuda",
             compute_type="int8"
         )
-        print("✅ Faster-Whisper (Medium) loaded on CUDA (int8)")
+        print(f"✅ Faster-Whisper ({name}) loaded on CUDA (int8)")
     except Exception:
         print("⚠️ CUDA failed, falling back to CPU")
-        whisper_model = WhisperModel(
-            "medium.en",
+        model = WhisperModel(
+            name,
             device="cpu",
             compute_type="int8"
         )
-        print("✅ Faster-Whisper (Medium) loaded on CPU (int8)")
+        print(f"✅ Faster-Whisper ({name}) loaded on CPU (int8)")
+    return model
+
+def run_sequential_session(capture):
+    """One active chat session, handling each command to completion before listening again."""
+    last_activity = time.time()
+
+    while time.time() - last_activity <= INACTIVITY_LIMIT:
+        try:
+            command = capture()
+            if command is None:
+                continue
+            last_activity = time.time()
+
+            plan = plan_command(*command)
+            if plan:
+                # Let the preamble finish before acting
+                with metrics.span("tts.speech"):
+                    tts.wait()
+                execute_command(command[0], plan)
+
+            last_activity = time.time()
+
+        except Exception as e:
+            print(f"❌ Active loop error: {e}")
+
+def main():
+    print("🧠 Loading models...")
+
+    whisper_model = None
+    wake_model = None
+
+    def warm_tts():
+        # Starts Piper and synthesizes the fixed acknowledgements
+        prewarm = tts.prewarm(CANNED_PHRASES)
+        if prewarm:
+            prewarm.join()
+
+    # Everything is independent, so load it all at once
+    tasks = {
+        WHISPER_MODEL: lambda: load_whisper(WHISPER_MODEL),
+        "porcupine": init_wake_word_engine,
+        "piper": warm_tts,
+        "embedder": lambda: load_tool_module("tools.memory"),
+        "ollama": preload_llm,
+    }
+    if FAST_WHISPER_MODEL:
+        tasks[FAST_WHISPER_MODEL] = lambda: load_whisper(FAST_WHISPER_MODEL)
+
+    loaded, failed = warm_up(tasks)
+
+    # Spans/counters, JSONL trace and /metrics endpoint (JARVIS_METRICS* env vars)
+    metrics.start()
+
+    # Load Faster-Whisper ONCE
+    whisper_model = loaded.get(WHISPER_MODEL)
+    wake_model = loaded.get("porcupine")
+
+    if whisper_model is None or wake_model is None:
+        if whisper_model is None:
+            print(f"❌ Whisper init failed: {failed.get(WHISPER_MODEL)}")
+        if wake_model is None:
+            print(f"❌ Wake word init failed: {failed.get('porcupine')}")
+        else:
+            wake_model.delete()
+        tts.shutdown()
+        return
+    print("✅ Wake word engine ready")
+
+    stt_engine = whisper_model
+
+    if loaded.get(FAST_WHISPER_MODEL):
+        stt_engine = CascadeTranscriber([
+            {
+                "name": FAST_WHISPER_MODEL,
+                "model": loaded[FAST_WHISPER_MODEL],
+                "options": FAST_DECODE_OPTIONS,
+                "min_confidence": ESCALATE_BELOW_CONFIDENCE,
+                "max_no_speech": ESCALATE_ABOVE_NO_SPEECH,
+            },
+            {"name": WHISPER_MODEL, "model": whisper_model},
+        ])
+
+    # One always-on microphone shared by the wake word and command capture.
+    # Frames captured while Jarvis is talking are flagged; command capture
+    # mutes those no louder than the echo of our own voice.
+    mic_stream = MicrophoneStream(
+        frame_length=wake_model.frame_length,
+        gate=lambda: tts.is_speaking(tail=0.2)
+    )
 
+    # The microphone feeds Whisper in memory, so formats must match exactly
     try:
-        wake_model = init_wake_word_engine()
-        print("✅ Wake word engine ready")
-    except Exception as e:
-        print(f"❌ Wake word init failed: {e}")
+        check_audio_format(whisper_model, mic_stream.sample_rate, SAMPLE_WIDTH)
+    except RuntimeError as e:
+        print(f"❌ Audio format check failed: {e}")
+        wake_model.delete()
+        tts.shutdown()
         return
 
+    mic_stream.start()
+
+    # Keep the app registry current as apps are installed/removed
+    watch_apps()
+
+    # Import tool modules (memory DB, embedder, GUI, web) off the main thread
+    prewarm_tools()
+
+    # Ambient energy is tracked continuously while idle, so there is no
+    # blocking calibration step on activation
+    noise_floor = NoiseFloorEstimator(frame_seconds=wake_model.frame_length / mic_stream.sample_rate)
+
     recognizer = sr.Recognizer()
 
     recognizer.energy_threshold = 200
@@ -332,91 +712,76 @@ def main():
     recognizer.pause_threshold = 2.0
     recognizer.non_speaking_duration = 0.5
 
-    INACTIVITY_LIMIT = 300 
-    
-    # RELAXED CONFIDENCE THRESHOLDS (Production-Grade)
-    HIGH_CONFIDENCE = 0.60
-    MEDIUM_CONFIDENCE = 0.40
-    LOW_CONFIDENCE = 0.25
+    # Shares the wake word engine, so it only runs during active sessions.
+    # It always learns the echo level; BARGE_IN lets it interrupt playback.
+    barge_in = BargeInMonitor(mic_stream, wake_model, interrupt=BARGE_IN)
 
     print("🧠 Jarvis main loop started")
 
     try:
         while True:
-            wait_for_wake_word(wake_model)
+            # Idle time: consolidate long-term memory until the wake word
+            consolidator = memory_consolidator()
+            if consolidator:
+                consolidator.start()
+
+            wake_pos = wait_for_wake_word(wake_model, mic_stream, on_idle_frame=noise_floor.update)
+
+            if consolidator:
+                consolidator.stop()
 
             print("🟢 Active Chat Mode Enabled")
 
-            with sr.Microphone(sample_rate=SAMPLE_RATE) as source:
-                print("🎙️ Calibrating ambient noise...")
-                recognizer.adjust_for_ambient_noise(source, duration=2.0)
-                print(f"✅ Energy threshold: {recognizer.energy_threshold}")
-
-                last_activity = time.time()
-
-                while True:
-                    if time.time() - last_activity > INACTIVITY_LIMIT:
-                        print("💤 Inactivity timeout")
-                        speak("I am going to sleep now.")
-                        break
-
-                    try:
-                        audio = listen_for_command(recognizer, source, timeout=5)
-                        text, confidence = transcribe(audio, whisper_model)
-
-                        if not text or confidence < LOW_CONFIDENCE:
-                            # Too low confidence or silence (Noise)
-                            if confidence > 0:
-                                print(f"🔇 Ignored noise/low confidence ({confidence:.2f})...")
-                            continue
-
-                        print(f"👤 You ({confidence:.2f}): {text}")
-                        last_activity = time.time()
-                        
-                        # --- CONFIDENCE ROUTING ---
-                        
-                        # 1. Medium Confidence: Confirm with user (Soft check)
-                        if confidence < HIGH_CONFIDENCE:
-                            print(f"⚠️ Confidence {confidence:.2f} < {HIGH_CONFIDENCE}. Soft confirmation.")
-                            speak(f"Okay, {text}.") # Acknowledge but proceed cautiously or confirm
-                        
-                        # 2. High Confidence (or Medium Proceed): Execute
-                        response_json = ask_llm(text)
-                        
-                        if response_json:
-                            try:
-                                result = json.loads(response_json)
-                                
-                                # 1. Speak (if any)
-                                if result.get("speech"):
-                                    speak(result["speech"])
-                                
-                                # 2. Execute Plan (if any)
-                                plan = result.get("plan")
-                                if plan:
-                                    execute_plan_with_repair(plan, text)
-                                    
-                            except json.JSONDecodeError:
-                                print(f"❌ Failed to parse JSON: {response_json}")
-                                speak("I'm having trouble structuring my thoughts.")
-                        
-                        last_activity = time.time()
-
-                    except sr.WaitTimeoutError:
-                        continue
-                    except Exception as e:
-                        print(f"❌ Active loop error: {e}")
+            recognizer.energy_threshold = noise_floor.threshold()
+            print(f"✅ Energy threshold: {recognizer.energy_threshold:.0f}")
+
+            # Command capture starts right after the wake word
+            with RingBufferSource(mic_stream, wake_pos, echo_level=barge_in.echo_threshold) as source:
+
+                transcriber = StreamingTranscriber(stt_engine, recognizer.energy_threshold, on_partial=show_partial)
+
+                def capture():
+                    return capture_command(source, transcriber, recognizer, stt_engine)
+
+                barge_in.start(recognizer.energy_threshold)
+                try:
+                    if ASYNC_PIPELINE:
+                        VoicePipeline(capture, plan_command, execute_command, INACTIVITY_LIMIT).run()
+                    else:
+                        run_sequential_session(capture)
+                finally:
+                    barge_in.stop()
+
+            print("💤 Inactivity timeout")
+            speak("I am going to sleep now.")
+            if isinstance(stt_engine, CascadeTranscriber):
+                print(stt_engine.report())
 
     except KeyboardInterrupt:
         print("\nStopping Jarvis...")
     finally:
         # ---- ROBUST CLEANUP ----
         print("🛑 Cleaning up resources...")
+        mic_stream.stop()
+
         if wake_model:
             wake_model.delete()
         
+        if isinstance(stt_engine, CascadeTranscriber):
+            print(stt_engine.report())
+        plan_cache.flush()
+        print(plan_cache.report())
+        embeddings = getattr(sys.modules.get("tools.memory"), "embeddings", None)
+        if embeddings is not None:
+            print(embeddings.report())
+        if metrics.ENABLED:
+            print(metrics.report())
+
         if whisper_model:
             del whisper_model
+        stt_engine = None
+
+        tts.shutdown()
         
         # Force garbage collection to free CUDA memory
         gc.collect()
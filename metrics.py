@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------------- CONFIG ----------------
+# JARVIS_METRICS=1           enable spans/counters/histograms
+# JARVIS_TRACE_FILE=path     also append every span to a JSONL trace (implies enabled)
+# JARVIS_METRICS_PORT=9464   also serve Prometheus text on 127.0.0.1:<port>/metrics
+
+TRACE_FILE = os.getenv("JARVIS_TRACE_FILE")
+METRICS_PORT = int(os.getenv("JARVIS_METRICS_PORT", "0") or 0)
+ENABLED = os.getenv("JARVIS_METRICS", "0") == "1" or bool(TRACE_FILE) or bool(METRICS_PORT)
+
+# Latency histogram bucket upper bounds (seconds)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_trace = None
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+
+class _NoopSpan:
+    """Returned when metrics are disabled: no clock reads, no allocation."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = time.perf_counter() - self.start
+        record = {"span": self.name, "ts": self.wall, "ms": round(seconds * 1000, 3), **self.attrs}
+
+        # Histograms only hold completed stages (a listen that times out
+        # isn't a latency); failures are counted and traced instead
+        with _lock:
+            if exc_type is None:
+                _histograms.setdefault(self.name, Histogram()).observe(seconds)
+            else:
+                key = f"{self.name}.errors"
+                _counters[key] = _counters.get(key, 0) + 1
+                record["error"] = repr(exc_value)
+        _write_trace(record)
+        return False
+
+# ---------------- PUBLIC API ----------------
+
+def span(name, **attrs):
+    """Times a block: `with metrics.span("llm"):`. Free when disabled."""
+    if not ENABLED:
+        return _NOOP_SPAN
+    return Span(name, attrs)
+
+
+def count(name, value=1):
+    """Increments a counter."""
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+    _write_trace({"counter": name, "ts": time.time(), "value": value})
+
+
+def start():
+    """Opens the trace file and starts the Prometheus endpoint, if configured."""
+    global _trace
+    if not ENABLED:
+        return
+    if TRACE_FILE and _trace is None:
+        _trace = open(TRACE_FILE, "a", buffering=1)
+        print(f"📈 Tracing to {TRACE_FILE}")
+    if METRICS_PORT:
+        serve(METRICS_PORT)
+
+
+def snapshot():
+    """Returns a copy of all counters and histograms."""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "histograms": {
+                name: {"count": h.count, "sum": h.sum, "buckets": list(h.buckets)}
+                for name, h in _histograms.items()
+            },
+        }
+
+
+def report():
+    """One line per stage (count, mean), then the counters."""
+    data = snapshot()
+    lines = ["📈 Stage latencies:"]
+    for name, h in sorted(data["histograms"].items()):
+        mean = h["sum"] / h["count"] if h["count"] else 0.0
+        lines.append(f"   {name:<24} {h['count']:6d} x {mean * 1000:8.1f} ms")
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f"   {name:<24} {value:6d}")
+    return "\n".join(lines)
+
+
+def prometheus_text():
+    """Renders the metrics in the Prometheus text exposition format."""
+    data = snapshot()
+    lines = []
+
+    if data["counters"]:
+        lines.append("# TYPE jarvis_events_total counter")
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f'jarvis_events_total{{event="{name}"}} {value}')
+
+    if data["histograms"]:
+        lines.append("# TYPE jarvis_stage_seconds histogram")
+    for name, h in sorted(data["histograms"].items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), h["buckets"]):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'jarvis_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'jarvis_stage_seconds_sum{{stage="{name}"}} {h["sum"]:.6f}')
+        lines.append(f'jarvis_stage_seconds_count{{stage="{name}"}} {h["count"]}')
+
+    return "\n".join(lines) + "\n"
+
+
+def serve(port):
+    """Serves /metrics on localhost from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"📈 Metrics at http://127.0.0.1:{port}/metrics")
+    return server
+
+# ---------------- INTERNALS ----------------
+
+def _write_trace(record):
+    if _trace is None:
+        return
+    line = json.dumps(record, default=str)
+    with _lock:
+        _trace.write(line + "\n")
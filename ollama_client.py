@@ -0,0 +1,130 @@
+import json
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ---------------- CONFIG ----------------
+
+OLLAMA_HOST = "http://localhost:11434"
+
+# Timing/token fields Ollama returns on the final chunk (durations in ns)
+STAT_FIELDS = (
+    "total_duration", "load_duration",
+    "prompt_eval_count", "prompt_eval_duration",
+    "eval_count", "eval_duration",
+)
+
+
+class GenerationCancelled(Exception):
+    """Raised by generate() when its cancel() callback returns True."""
+
+
+class OllamaClient:
+    """
+    Ollama /api/generate client.
+    - One pooled keep-alive requests.Session for all calls.
+    - keep_alive is sent with every request so the model stays loaded.
+      The system prompt is sent as-is on every call; while the model stays
+      loaded Ollama reuses the KV cache of the unchanged prompt prefix, so
+      the static tool prompt isn't re-evaluated every turn.
+    - Per-call token counts and durations are kept in last_stats/history.
+    """
+
+    def __init__(self, model, host=OLLAMA_HOST, keep_alive="30m", timeout=60, pool_size=4):
+        self.model = model
+        self.url = f"{host.rstrip('/')}/api/generate"
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.last_stats = None
+        self.history = deque(maxlen=100)
+
+    # ---- Public API ----
+
+    def preload(self):
+        """Loads the model into memory (a request with no prompt only loads it)."""
+        r = self.session.post(self.url, json={"model": self.model, "keep_alive": self.keep_alive}, timeout=120)
+        r.raise_for_status()
+
+    def generate(self, prompt, system=None, json_format=False, on_token=None, cancel=None):
+        """
+        Returns the full response text.
+        If on_token is given the response is streamed and on_token(text) is
+        called for each chunk as it arrives.
+        cancel() is polled before the request and between streamed chunks
+        (a call with cancel is always streamed internally); once it returns
+        True the connection is dropped, which stops generation on the server.
+        Raises requests.exceptions.RequestException / ValueError on failure,
+        GenerationCancelled when cancelled.
+        """
+        if cancel and cancel():
+            raise GenerationCancelled()
+
+        payload = self._payload(prompt, system)
+        if json_format:
+            payload["format"] = "json"
+
+        if on_token is None and cancel is None:
+            payload["stream"] = False
+            r = self.session.post(self.url, json=payload, timeout=self.timeout)
+            r.raise_for_status()
+            data = r.json()
+            self._record(data)
+            return data["response"]
+
+        payload["stream"] = True
+        parts = []
+        # (connect, read) - the read timeout applies between chunks
+        with self.session.post(self.url, json=payload, stream=True, timeout=(5, self.timeout)) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if cancel and cancel():
+                    raise GenerationCancelled()
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise ValueError(chunk["error"])
+
+                token = chunk.get("response", "")
+                if token:
+                    parts.append(token)
+                    if on_token:
+                        on_token(token)
+
+                if chunk.get("done"):
+                    self._record(chunk)
+                    break
+        return "".join(parts)
+
+    def format_stats(self, stats=None):
+        stats = stats or self.last_stats
+        if not stats:
+            return "📈 LLM: no calls yet"
+        return (
+            f"📈 LLM: prompt {stats['prompt_eval_count'] or 0} tok / {stats['prompt_eval_ms']:.0f} ms, "
+            f"gen {stats['eval_count'] or 0} tok / {stats['eval_ms']:.0f} ms, "
+            f"total {stats['total_ms']:.0f} ms"
+        )
+
+    # ---- Internals ----
+
+    def _payload(self, prompt, system):
+        payload = {"model": self.model, "prompt": prompt, "keep_alive": self.keep_alive}
+        if system:
+            payload["system"] = system
+        return payload
+
+    def _record(self, data):
+        stats = {field: data.get(field) for field in STAT_FIELDS}
+        stats["prompt_eval_ms"] = (stats["prompt_eval_duration"] or 0) / 1e6
+        stats["eval_ms"] = (stats["eval_duration"] or 0) / 1e6
+        stats["total_ms"] = (stats["total_duration"] or 0) / 1e6
+        self.last_stats = stats
+        self.history.append(stats)
@@ -0,0 +1,104 @@
+import time
+import asyncio
+
+import tts
+
+# Sentinel passed down the queues when the session ends
+_END = object()
+
+
+class VoicePipeline:
+    """
+    One active chat session as concurrent asyncio stages joined by queues:
+
+        capture (mic + STT) -> think (router / plan cache / LLM) -> execute (tools)
+
+    TTS is the fourth stage: replies are queued on the tts.py engine, whose
+    workers synthesize and play them in order.
+    - capture() -> (text, confidence) or None; blocks for at most its timeout.
+    - think(text, confidence) -> plan or None; queues any spoken reply.
+    - execute(text, plan) runs a plan to completion.
+    Blocking calls run in worker threads, so the stages overlap: the spoken
+    preamble plays while the plan executes, and capture keeps reading the
+    shared ring buffer while a command is being planned or executed. Frames
+    recorded during playback are skipped by the source, so the next command
+    is heard as soon as playback ends, without reopening the microphone.
+    The session ends after inactivity_limit seconds with no command and
+    nothing in flight.
+    """
+
+    def __init__(self, capture, think, execute, inactivity_limit=300):
+        self.capture = capture
+        self.think = think
+        self.execute = execute
+        self.inactivity_limit = inactivity_limit
+        self.last_activity = time.time()
+        self._in_flight = 0  # Commands captured but not yet finished
+
+    def run(self):
+        """Runs the session; returns when it times out."""
+        asyncio.run(self._run())
+
+    # ---- Stages ----
+
+    async def _run(self):
+        commands = asyncio.Queue()
+        plans = asyncio.Queue()
+        await asyncio.gather(
+            self._capture_stage(commands),
+            self._think_stage(commands, plans),
+            self._execute_stage(plans),
+        )
+
+    async def _capture_stage(self, commands):
+        while not self._expired():
+            try:
+                command = await asyncio.to_thread(self.capture)
+            except Exception as e:
+                print(f"❌ Capture error: {e}")
+                continue
+            if command is None:
+                continue
+
+            self._touch()
+            self._in_flight += 1
+            await commands.put(command)
+
+        await commands.put(_END)
+
+    async def _think_stage(self, commands, plans):
+        while (command := await commands.get()) is not _END:
+            try:
+                plan = await asyncio.to_thread(self.think, *command)
+            except Exception as e:
+                print(f"❌ Active loop error: {e}")
+                plan = None
+
+            if plan:
+                await plans.put((command[0], plan))
+            else:
+                self._finish()
+
+        await plans.put(_END)
+
+    async def _execute_stage(self, plans):
+        while (job := await plans.get()) is not _END:
+            try:
+                await asyncio.to_thread(self.execute, *job)
+            except Exception as e:
+                print(f"❌ Plan execution error: {e}")
+            self._finish()
+
+    # ---- Internals ----
+
+    def _touch(self):
+        self.last_activity = time.time()
+
+    def _finish(self):
+        self._in_flight -= 1
+        self._touch()
+
+    def _expired(self):
+        if self._in_flight or tts.is_speaking():
+            return False
+        return time.time() - self.last_activity > self.inactivity_limit
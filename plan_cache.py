@@ -0,0 +1,233 @@
+import os
+import copy
+import json
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from intent_router import normalize
+
+# ---------------- CONFIG ----------------
+
+PLAN_CACHE_FILE = "plan_cache.json"
+PLAN_CACHE_MAX_ENTRIES = 256
+PLAN_CACHE_TTL = 7 * 24 * 3600  # seconds
+# Changes are written in the background this long after the first one
+PLAN_CACHE_SAVE_DELAY = 2.0  # seconds
+
+# Cosine similarity needed to reuse the plan of a differently worded command
+SIMILARITY_THRESHOLD = 0.92
+
+
+class PlanCache:
+    """
+    Caches agent results ({"speech", "plan"}) by normalized transcript.
+    - Bounded LRU with a TTL, persisted to PLAN_CACHE_FILE across restarts.
+      Writes are batched on a background timer (flush() on shutdown);
+      command embeddings go to a binary .npy file next to it, one row per
+      entry, and entries without a stored row are embedded on first use.
+    - Only plans made entirely of safe_tools are cached: replaying a plan
+      with side effects (typing text, opening URLs, storing memories) from
+      a stale or misheard command is never worth the saved LLM call.
+    - Optional near-duplicate lookup: embed(text) -> vector (or None when no
+      embedder is loaded), for differently worded commands.
+    - invalidate() drops a plan, e.g. after it failed during execution. For
+      a plan served to a similar command it drops the entry that matched.
+    """
+
+    def __init__(self, path=PLAN_CACHE_FILE, max_entries=PLAN_CACHE_MAX_ENTRIES,
+                 ttl=PLAN_CACHE_TTL, embed=None, safe_tools=(), save_delay=PLAN_CACHE_SAVE_DELAY):
+        self.path = path
+        self.vectors_path = os.path.splitext(path)[0] + ".npy"
+        self.save_delay = save_delay
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embed = embed
+        self.safe_tools = set(safe_tools)
+        self.stats = {"hits": 0, "similar_hits": 0, "misses": 0, "invalidations": 0}
+        self._entries = OrderedDict()
+        self._matched = OrderedDict()  # key served by a similar hit -> cached key
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self._load()
+
+    # ---- Public API ----
+
+    def get(self, text):
+        """Returns a copy of the cached result for text, or None."""
+        key = normalize(text)
+        if not key:
+            return None
+
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return copy.deepcopy(entry["result"])
+
+        match = self._similar(key)
+        with self._lock:
+            if match:
+                matched_key, entry = match
+                self._matched[key] = matched_key
+                self._matched.move_to_end(key)
+                while len(self._matched) > self.max_entries:
+                    self._matched.popitem(last=False)
+                self.stats["similar_hits"] += 1
+                return copy.deepcopy(entry["result"])
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, text, result):
+        key = normalize(text)
+        if not key or not result.get("plan") or result.get("intent") == "error":
+            return
+        if not self._is_safe(result):
+            return
+
+        embedding = self._embed(key)
+        with self._lock:
+            self._entries[key] = {
+                "result": {"speech": result.get("speech"), "plan": result["plan"]},
+                "created": time.time(),
+                "embedding": embedding,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._schedule_save()
+
+    def invalidate(self, text):
+        key = normalize(text)
+        with self._lock:
+            key = self._matched.pop(key, key)
+            if self._entries.pop(key, None) is None:
+                return
+            self.stats["invalidations"] += 1
+        self._schedule_save()
+
+    def flush(self):
+        """Writes pending changes now, e.g. on shutdown."""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+            self._save()
+
+    def report(self):
+        lookups = self.stats["hits"] + self.stats["similar_hits"] + self.stats["misses"]
+        hit_rate = (self.stats["hits"] + self.stats["similar_hits"]) / lookups if lookups else 0.0
+        return (
+            f"🗂️ Plan cache: {len(self._entries)} entries, hit rate {hit_rate:.1%} "
+            f"(exact {self.stats['hits']}, similar {self.stats['similar_hits']}, "
+            f"miss {self.stats['misses']}, invalidated {self.stats['invalidations']})"
+        )
+
+    # ---- Internals ----
+
+    def _is_safe(self, result):
+        return all(step.get("tool") in self.safe_tools for step in result.get("plan") or [])
+
+    def _embed(self, key):
+        if not self.embed:
+            return None
+        try:
+            vector = self.embed(key)
+        except Exception as e:
+            print(f"⚠️ Plan cache embedding failed: {e}")
+            return None
+        return None if vector is None else np.asarray(vector, dtype=np.float32).ravel()
+
+    def _similar(self, key):
+        with self._lock:
+            candidates = list(self._entries.items())
+        if not candidates:
+            return None
+
+        query = self._embed(key)
+        if query is None:
+            return None
+
+        for cached_key, entry in candidates:
+            if entry["embedding"] is None:
+                entry["embedding"] = self._embed(cached_key)
+        candidates = [(k, e) for k, e in candidates if e["embedding"] is not None and e["embedding"].size == query.size]
+        if not candidates:
+            return None
+
+        matrix = np.stack([e["embedding"] for _, e in candidates])
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        scores = matrix @ query / np.maximum(norms, 1e-9)
+
+        best = int(np.argmax(scores))
+        if scores[best] >= SIMILARITY_THRESHOLD:
+            return candidates[best]
+        return None
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for key in [k for k, e in self._entries.items() if e["created"] < cutoff]:
+            del self._entries[key]
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        try:
+            vectors = np.load(self.vectors_path)
+        except (OSError, ValueError):
+            vectors = None
+        if vectors is not None and (vectors.ndim != 2 or len(vectors) != len(entries) or not vectors.shape[1]):
+            vectors = None  # Not from the same save; re-embed on use
+
+        for row, (key, entry) in enumerate(entries):
+            # Files written before unsafe plans were excluded may still hold some
+            if not self._is_safe(entry["result"]):
+                continue
+            embedding = entry.get("embedding")  # Older files kept it inline
+            if vectors is not None and not np.isnan(vectors[row]).any():
+                embedding = vectors[row]
+            entry["embedding"] = None if embedding is None else np.asarray(embedding, dtype=np.float32)
+            self._entries[key] = entry
+        self._expire()
+
+    def _schedule_save(self):
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self._save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save(self):
+        with self._lock:
+            self._save_timer = None
+            entries = list(self._entries.items())
+
+        records = [(key, {"result": e["result"], "created": e["created"]}) for key, e in entries]
+        dim = next((e["embedding"].size for _, e in entries if e["embedding"] is not None), 0)
+        vectors = np.full((len(entries), dim), np.nan, dtype=np.float32)
+        for row, (_, e) in enumerate(entries):
+            if e["embedding"] is not None and e["embedding"].size == dim:
+                vectors[row] = e["embedding"]
+
+        with self._save_lock:
+            try:
+                self._replace(self.vectors_path, "wb", lambda f: np.save(f, vectors))
+                self._replace(self.path, "w", lambda f: json.dump(records, f))
+            except OSError as e:
+                print(f"⚠️ Plan cache save failed: {e}")
+
+    @staticmethod
+    def _replace(path, mode, write):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
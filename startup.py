@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _timed(func):
+    start = time.perf_counter()
+    try:
+        return func(), None, time.perf_counter() - start
+    except Exception as e:
+        return None, e, time.perf_counter() - start
+
+
+def warm_up(tasks):
+    """
+    Runs independent start-up tasks concurrently and prints a per-component
+    timing breakdown.
+    Args:
+        tasks (dict): Component name -> zero-argument callable.
+    Returns:
+        (results, errors): dicts keyed by component name.
+    """
+    results = {}
+    errors = {}
+    timings = {}
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="warmup") as pool:
+        futures = {name: pool.submit(_timed, func) for name, func in tasks.items()}
+        for name, future in futures.items():
+            result, error, elapsed = future.result()
+            timings[name] = elapsed
+            if error is not None:
+                errors[name] = error
+            else:
+                results[name] = result
+    wall = time.perf_counter() - start
+
+    print(startup_report(timings, errors, wall))
+    return results, errors
+
+
+def startup_report(timings, errors, wall):
+    """Formats the timing table, slowest component first."""
+    longest = max(timings.values(), default=0.0) or 1.0
+    lines = ["⏱️ Startup timing:"]
+    for name, seconds in sorted(timings.items(), key=lambda kv: -kv[1]):
+        bar = "█" * max(1, int(20 * seconds / longest))
+        status = "❌" if name in errors else "✅"
+        lines.append(f"   {status} {name:<12} {seconds * 1000:8.0f} ms  {bar}")
+    lines.append(f"   Wall clock {wall * 1000:.0f} ms (serial would be {sum(timings.values()) * 1000:.0f} ms)")
+    for name, error in errors.items():
+        lines.append(f"   ⚠️ {name}: {error}")
+    return "\n".join(lines)
@@ -0,0 +1,319 @@
+import time
+import threading
+import numpy as np
+
+import metrics
+
+# ---------------- CONFIG ----------------
+
+# faster-whisper expects 16 kHz mono float32; the microphone delivers int16
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2
+
+# Tuned parameters for Medium INT8
+DECODE_OPTIONS = {
+    "beam_size": 7,
+    "temperature": 0.0,
+    "condition_on_previous_text": False,
+    "vad_filter": True,
+    "no_speech_threshold": 0.6,
+    "log_prob_threshold": -1.0,
+}
+
+# ---- Streaming mode ----
+# Seconds of new speech between partial hypotheses
+PARTIAL_INTERVAL = 0.8
+# Trailing silence that ends an utterance (VAD endpoint)
+ENDPOINT_SILENCE = 0.6
+# Audio kept from before speech onset so the first phoneme isn't clipped
+PRE_ROLL = 0.3
+MAX_UTTERANCE = 15.0
+
+# Partials only need to be fast, not final-quality
+PARTIAL_OPTIONS = {
+    "beam_size": 1,
+    "vad_filter": False,
+    "without_timestamps": True,
+}
+
+# ---- Cascade ----
+# Fast first-pass decoding for the small model
+FAST_DECODE_OPTIONS = {
+    "beam_size": 1,
+}
+# The fast tier's answer is kept only at or above this confidence
+# (same 0-1 scale as gate_hypothesis) and at or below this no_speech_prob
+ESCALATE_BELOW_CONFIDENCE = 0.55
+ESCALATE_ABOVE_NO_SPEECH = 0.4
+
+# Hallucination Guard
+HALLUCINATIONS = {
+    "you", "thank you", "thanks",
+    "subtitles by", "amara.org", "mbc"
+}
+
+# ---------------- FORMAT ----------------
+
+def check_audio_format(model, sample_rate=SAMPLE_RATE, sample_width=SAMPLE_WIDTH):
+    """
+    Fails fast at startup if the capture format does not match what the
+    in-memory transcription path feeds to Whisper.
+    """
+    expected_rate = model.feature_extractor.sampling_rate
+    if sample_rate != expected_rate:
+        raise RuntimeError(f"Microphone rate {sample_rate} Hz does not match Whisper ({expected_rate} Hz)")
+    if sample_width != SAMPLE_WIDTH:
+        raise RuntimeError(f"Microphone sample width {sample_width} bytes, expected {SAMPLE_WIDTH} (int16)")
+
+
+def pcm_to_float32(raw):
+    """
+    Converts int16 PCM bytes to normalized float32.
+    np.frombuffer is a view over the bytes; astype is the only copy.
+    """
+    pcm = np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+    pcm *= 1.0 / 32768.0
+    return pcm
+
+
+def audio_to_pcm(audio_data):
+    """Returns the float32 buffer for an sr.AudioData captured at SAMPLE_RATE."""
+    if audio_data.sample_rate != SAMPLE_RATE or audio_data.sample_width != SAMPLE_WIDTH:
+        raise ValueError(
+            f"Unexpected audio format ({audio_data.sample_rate} Hz, {audio_data.sample_width} bytes)"
+        )
+    return pcm_to_float32(audio_data.get_raw_data())
+
+# ---------------- TRANSCRIPTION ----------------
+
+def transcribe(audio_data, model):
+    return transcribe_pcm(audio_to_pcm(audio_data), model)
+
+
+def transcribe_pcm(pcm, model, **options):
+    """
+    Decodes a float32 buffer directly (no temp file) and applies the
+    hallucination and confidence gating.
+    Returns: (text or None, confidence)
+    """
+    with metrics.span("transcribe", audio_ms=round(len(pcm) / SAMPLE_RATE * 1000)):
+        if isinstance(model, CascadeTranscriber):
+            return model.transcribe_pcm(pcm)
+        return gate_hypothesis(*decode(pcm, model, **options))
+
+
+def decode(pcm, model, **options):
+    """Returns (text, avg_logprob, max_no_speech) without any gating."""
+    segments, info = model.transcribe(pcm, **{**DECODE_OPTIONS, **options})
+
+    texts = []
+    logprobs = []
+    no_speech_probs = []
+
+    for seg in segments:
+        texts.append(seg.text.strip())
+        logprobs.append(seg.avg_logprob)
+        no_speech_probs.append(seg.no_speech_prob)
+
+    if not logprobs:
+        return "", None, None
+
+    final_text = " ".join(texts).strip()
+    return final_text, sum(logprobs) / len(logprobs), max(no_speech_probs)
+
+
+def gate_hypothesis(final_text, avg_logprob, max_no_speech):
+    """Hallucination and confidence gating. Returns (text or None, confidence)."""
+    if final_text.lower().strip(".,!?") in HALLUCINATIONS:
+        return None, 0.0
+
+    # ---- CONFIDENCE GATING ----
+    if not final_text or avg_logprob is None:
+        return None, 0.0
+
+    # Normalize logprob to roughly 0-1 scale (heuristic)
+    # logprob 0 = 100%, -1 = 37%, -2 = 13%
+    # Simple clamp: max(0, (logprob + 1.0))
+    confidence = max(0.0, min(1.0, (avg_logprob + 1.0)))
+
+    # Reject if likely noise or very low confidence
+    # -0.7 is roughly 50% confidence
+    if avg_logprob < -0.7 or max_no_speech > 0.6:
+        return None, confidence
+
+    return final_text, confidence
+
+# ---------------- CASCADE ----------------
+
+class CascadeTranscriber:
+    """
+    Tiered transcription engine.
+    Each tier is a dict: {"name", "model", "options", "min_confidence",
+    "max_no_speech"}. Tiers run in order (cheapest first) and an utterance is
+    escalated to the next tier only when the current one is not confident.
+    The last tier's answer is always final.
+    Can be passed anywhere a WhisperModel is accepted by transcribe().
+    """
+
+    def __init__(self, tiers):
+        self.tiers = tiers
+        self.stats = {
+            tier["name"]: {"calls": 0, "accepted": 0, "seconds": 0.0}
+            for tier in tiers
+        }
+        self.utterances = 0
+
+    @property
+    def fast_model(self):
+        return self.tiers[0]["model"]
+
+    def transcribe_pcm(self, pcm):
+        self.utterances += 1
+
+        for i, tier in enumerate(self.tiers):
+            start = time.perf_counter()
+            with metrics.span(f"transcribe.{tier['name']}"):
+                text, avg_logprob, max_no_speech = decode(pcm, tier["model"], **tier.get("options", {}))
+            stats = self.stats[tier["name"]]
+            stats["calls"] += 1
+            stats["seconds"] += time.perf_counter() - start
+
+            result = gate_hypothesis(text, avg_logprob, max_no_speech)
+            final = i == len(self.tiers) - 1
+
+            # No segments survived the VAD filter: every tier would see the
+            # same silence, so don't pay for a bigger model
+            no_speech = avg_logprob is None
+
+            confident = (
+                result[0] is not None
+                and result[1] >= tier.get("min_confidence", 0.0)
+                and max_no_speech <= tier.get("max_no_speech", 1.0)
+            )
+
+            if final or no_speech or confident:
+                stats["accepted"] += 1
+                return result
+
+    def report(self):
+        """Per-tier hit rates and latencies, for tuning the thresholds."""
+        lines = [f"📊 STT cascade ({self.utterances} utterances)"]
+        for tier in self.tiers:
+            stats = self.stats[tier["name"]]
+            calls = stats["calls"]
+            hit_rate = stats["accepted"] / calls if calls else 0.0
+            avg_ms = 1000 * stats["seconds"] / calls if calls else 0.0
+            lines.append(
+                f"   {tier['name']:<10} calls={calls:<5} accepted={hit_rate:6.1%} avg={avg_ms:7.1f} ms"
+            )
+        return "\n".join(lines)
+
+# ---------------- STREAMING ----------------
+
+def frame_energy(raw):
+    """RMS of an int16 chunk, in the same units as Recognizer.energy_threshold."""
+    samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(samples * samples)))
+
+
+class StreamingTranscriber:
+    """
+    Chunked speech-to-text.
+    Audio chunks are fed as they arrive; while the user is talking, partial
+    hypotheses are decoded on a background thread and passed to on_partial.
+    An energy VAD endpoint (ENDPOINT_SILENCE of quiet after speech) triggers
+    the final decode, which goes through the usual confidence gating.
+    """
+
+    def __init__(self, model, energy_threshold, on_partial=None, sample_rate=SAMPLE_RATE):
+        self.model = model
+        # Partials only need to be fast: use the first cascade tier if there is one
+        self.partial_model = model.fast_model if isinstance(model, CascadeTranscriber) else model
+        self.energy_threshold = energy_threshold
+        self.on_partial = on_partial
+        self.sample_rate = sample_rate
+
+        # Whisper calls are serialized; a partial never runs during the final decode
+        self._decode_lock = threading.Lock()
+        self._partial_thread = None
+        self.reset()
+
+    def reset(self):
+        self._chunks = []
+        self._samples = 0
+        self._pre_roll = []
+        self._pre_roll_samples = 0
+        self._silence = 0
+        self._since_partial = 0
+        self.started = False
+        self.partial = ""
+
+    def feed(self, raw):
+        """
+        Feeds one int16 chunk.
+        Returns (text or None, confidence) once the utterance has ended, else None.
+        """
+        n = len(raw) // SAMPLE_WIDTH
+        loud = frame_energy(raw) > self.energy_threshold
+
+        if not self.started:
+            if not loud:
+                # Keep a short pre-roll of quiet audio before the onset
+                self._pre_roll.append(raw)
+                self._pre_roll_samples += n
+                while self._pre_roll_samples - len(self._pre_roll[0]) // SAMPLE_WIDTH > PRE_ROLL * self.sample_rate:
+                    self._pre_roll_samples -= len(self._pre_roll.pop(0)) // SAMPLE_WIDTH
+                return None
+
+            self.started = True
+            self._chunks = self._pre_roll
+            self._samples = self._pre_roll_samples
+            self._pre_roll = []
+
+        self._chunks.append(raw)
+        self._samples += n
+        self._since_partial += n
+        self._silence = 0 if loud else self._silence + n
+
+        if self._silence >= ENDPOINT_SILENCE * self.sample_rate or self._samples >= MAX_UTTERANCE * self.sample_rate:
+            return self.finalize()
+
+        if self.on_partial and loud and self._since_partial >= PARTIAL_INTERVAL * self.sample_rate:
+            self._since_partial = 0
+            self._start_partial()
+
+        return None
+
+    def finalize(self):
+        """Runs the final, gated decode on everything captured so far."""
+        pcm = pcm_to_float32(b"".join(self._chunks))
+        self.reset()
+        if pcm.size == 0:
+            return None, 0.0
+        with self._decode_lock:
+            return transcribe_pcm(pcm, self.model)
+
+    def _start_partial(self):
+        # Drop this partial if the previous one is still decoding
+        if self._partial_thread and self._partial_thread.is_alive():
+            return
+        pcm = pcm_to_float32(b"".join(self._chunks))
+        self._partial_thread = threading.Thread(target=self._run_partial, args=(pcm,), daemon=True)
+        self._partial_thread.start()
+
+    def _run_partial(self, pcm):
+        if not self._decode_lock.acquire(blocking=False):
+            return
+        try:
+            text, _, _ = decode(pcm, self.partial_model, **PARTIAL_OPTIONS)
+        except Exception as e:
+            print(f"⚠️ Partial decode failed: {e}")
+            return
+        finally:
+            self._decode_lock.release()
+
+        if text and self.started:
+            self.partial = text
+            self.on_partial(text)
@@ -1,7 +1,18 @@
 import os
 import json
 import glob
-from rapidfuzz import process, fuzz
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from rapidfuzz import process, fuzz, utils
+
+# Optional: kernel change notifications for the registry watcher
+try:
+    from inotify_simple import INotify, flags
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INotify = None
+    INOTIFY_AVAILABLE = False
 
 # Locations where Linux stores .desktop files
 APP_DIRS = [
@@ -13,68 +24,137 @@ APP_DIRS = [
 ]
 
 REGISTRY_FILE = "apps_registry.json"
+# Per-file mtime/size and parsed entry, used for incremental rescans
+SCAN_STATE_FILE = "apps_scan_state.json"
+
+SCAN_WORKERS = 8
+# Below this many changed files a thread pool isn't worth it
+PARALLEL_SCAN_MIN = 16
 
-def scan_apps():
+def parse_desktop_file(filepath):
     """
-    Scans system directories for .desktop files and builds a registry.
-    Returns: List of app dictionaries.
+    Parses one .desktop file.
+    Returns: App dictionary, or None for hidden/system entries.
     """
-    apps = []
-    seen_names = set()
+    try:
+        with open(filepath, "r", errors="ignore") as f:
+            name = None
+            exec_cmd = None
+            icon = None
+            generic_name = None
+            keywords = []
+            no_display = False
 
-    print("🔎 Scanning for installed applications...")
+            for line in f:
+                line = line.strip()
+                if line.startswith("Name=") and not name:
+                    name = line.split("=", 1)[1]
+                elif line.startswith("Exec=") and not exec_cmd:
+                    exec_cmd = line.split("=", 1)[1]
+                    # Clean up exec command (remove %u, %F, etc.)
+                    exec_cmd = exec_cmd.split("%")[0].strip()
+                    exec_cmd = exec_cmd.strip('"')
+                elif line.startswith("NoDisplay=true"):
+                    no_display = True
+                elif line.startswith("Icon="):
+                    icon = line.split("=", 1)[1]
+                elif line.startswith("GenericName=") and not generic_name:
+                    generic_name = line.split("=", 1)[1]
+                elif line.startswith("Keywords=") and not keywords:
+                    keywords = [k for k in line.split("=", 1)[1].split(";") if k]
+
+            # Filter out hidden/system apps
+            if name and exec_cmd and not no_display:
+                return {
+                    "name": name,
+                    "exec": exec_cmd,
+                    "icon": icon,
+                    "generic_name": generic_name,
+                    "keywords": keywords,
+                    "path": filepath
+                }
+    except Exception as e:
+        print(f"⚠️ Error reading {filepath}: {e}")
 
+    return None
+
+def _list_desktop_files():
+    """Returns {path: (mtime_ns, size)} for every .desktop file, in APP_DIRS order."""
+    files = {}
     for directory in APP_DIRS:
         if not os.path.exists(directory):
             continue
 
-        # Scan .desktop files
-        desktop_files = glob.glob(os.path.join(directory, "*.desktop"))
-        
-        for filepath in desktop_files:
+        for filepath in sorted(glob.glob(os.path.join(directory, "*.desktop"))):
             try:
-                with open(filepath, "r", errors="ignore") as f:
-                    name = None
-                    exec_cmd = None
-                    icon = None
-                    no_display = False
-
-                    for line in f:
-                        line = line.strip()
-                        if line.startswith("Name=") and not name:
-                            name = line.split("=", 1)[1]
-                        elif line.startswith("Exec=") and not exec_cmd:
-                            exec_cmd = line.split("=", 1)[1]
-                            # Clean up exec command (remove %u, %F, etc.)
-                            exec_cmd = exec_cmd.split("%")[0].strip()
-                            exec_cmd = exec_cmd.strip('"')
-                        elif line.startswith("NoDisplay=true"):
-                            no_display = True
-                        elif line.startswith("Icon="):
-                            icon = line.split("=", 1)[1]
-
-                    # Filter out hidden/system apps
-                    if name and exec_cmd and not no_display:
-                        if name.lower() not in seen_names:
-                            apps.append({
-                                "name": name,
-                                "exec": exec_cmd,
-                                "icon": icon,
-                                "path": filepath
-                            })
-                            seen_names.add(name.lower())
-
-            except Exception as e:
-                print(f"⚠️ Error reading {filepath}: {e}")
-
-    print(f"✅ Found {len(apps)} applications.")
-    
-    # Save to JSON
-    with open(REGISTRY_FILE, "w") as f:
-        json.dump(apps, f, indent=2)
-    
+                st = os.stat(filepath)
+            except OSError:
+                continue  # Removed (or dangling symlink) while scanning
+            files[filepath] = (st.st_mtime_ns, st.st_size)
+    return files
+
+def _load_scan_state():
+    try:
+        with open(SCAN_STATE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def scan_apps(full=False):
+    """
+    Scans system directories for .desktop files and builds a registry.
+    Incremental: per-file mtime and size are recorded in SCAN_STATE_FILE and
+    only new or changed files are reparsed (on a thread pool when there are
+    many, e.g. the first cold scan). Pass full=True to reparse everything.
+    Returns: List of app dictionaries.
+    """
+    print("🔎 Scanning for installed applications...")
+
+    state = {} if full else _load_scan_state()
+    files = _list_desktop_files()
+
+    changed = [
+        path for path, (mtime, size) in files.items()
+        if path not in state or state[path]["mtime"] != mtime or state[path]["size"] != size
+    ]
+    removed = [path for path in state if path not in files]
+
+    if len(changed) >= PARALLEL_SCAN_MIN:
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+            parsed = dict(zip(changed, pool.map(parse_desktop_file, changed)))
+    else:
+        parsed = {path: parse_desktop_file(path) for path in changed}
+
+    new_state = {}
+    for path, (mtime, size) in files.items():
+        entry = parsed[path] if path in parsed else state[path]["entry"]
+        new_state[path] = {"mtime": mtime, "size": size, "entry": entry}
+
+    # First directory wins on duplicate names, as before
+    apps = []
+    seen_names = set()
+    for record in new_state.values():
+        entry = record["entry"]
+        if entry and entry["name"].lower() not in seen_names:
+            apps.append(entry)
+            seen_names.add(entry["name"].lower())
+
+    print(f"✅ Found {len(apps)} applications ({len(changed)} changed, {len(removed)} removed).")
+
+    # Only rewrite the files when something actually changed
+    if changed or removed or not os.path.exists(REGISTRY_FILE):
+        _write_json(REGISTRY_FILE, apps, indent=2)
+        _write_json(SCAN_STATE_FILE, new_state)
+
     return apps
 
+def _write_json(path, data, **kwargs):
+    """Writes to a temp file and renames it, so readers never see half a file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, **kwargs)
+    os.replace(tmp_path, path)
+
 def load_registry():
     """Loads the app registry from JSON, scanning if it doesn't exist."""
     if not os.path.exists(REGISTRY_FILE):
@@ -83,6 +163,101 @@ def load_registry():
     with open(REGISTRY_FILE, "r") as f:
         return json.load(f)
 
+# ---------------- IN-MEMORY INDEX ----------------
+# Loaded once and rebuilt only when the registry file's mtime changes.
+# Choices are preprocessed up front so fuzzy matching does no per-call work.
+_index = {"mtime": None, "apps": [], "choices": [], "owners": [], "names": []}
+_index_lock = threading.Lock()
+
+def _registry_mtime():
+    try:
+        return os.stat(REGISTRY_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _build_index(registry, mtime):
+    choices = []
+    owners = []
+
+    # Names first, then GenericName, then Keywords: on equal scores
+    # extractOne keeps the earliest choice, so real names win ties
+    fields = (
+        lambda app: [app.get("name")],
+        lambda app: [app.get("generic_name")],
+        lambda app: app.get("keywords") or [],
+    )
+    for field in fields:
+        for idx, app in enumerate(registry):
+            for value in field(app):
+                processed = utils.default_process(value) if value else ""
+                if processed:
+                    choices.append(processed)
+                    owners.append(idx)
+
+    names = [utils.default_process(app.get("name") or "") for app in registry]
+    return {"mtime": mtime, "apps": registry, "choices": choices, "owners": owners, "names": names}
+
+def get_index():
+    """Returns the app index, reloading it only if the registry file changed."""
+    global _index
+    mtime = _registry_mtime()
+    if mtime is not None and mtime == _index["mtime"]:
+        return _index
+
+    with _index_lock:
+        mtime = _registry_mtime()
+        if mtime is None or mtime != _index["mtime"]:
+            registry = load_registry()
+            _index = _build_index(registry, _registry_mtime())
+        return _index
+
+def invalidate_index():
+    global _index
+    with _index_lock:
+        _index = {"mtime": None, "apps": [], "choices": [], "owners": [], "names": []}
+
+def match_app(query):
+    """
+    Fuzzy matches a query against the registry.
+    Returns: (app dict, score 0-100), or (None, 0).
+    """
+    index = get_index()
+    processed = utils.default_process(query or "")
+    if not index["choices"] or not processed:
+        return None, 0
+
+    # Fuzzy match (choices are already preprocessed)
+    match = process.extractOne(
+        processed,
+        index["choices"],
+        scorer=fuzz.token_set_ratio,
+        processor=None
+    )
+    if not match:
+        return None, 0
+
+    name, score, idx = match
+    return index["apps"][index["owners"][idx]], score
+
+def match_app_name(query):
+    """
+    Strictly matches a query against full app names (fuzz.ratio, so "settings"
+    does not match "NVIDIA X Server Settings" at 100).
+    Returns: (app dict, score 0-100, runner-up score), or (None, 0, 0).
+    """
+    index = get_index()
+    processed = utils.default_process(query or "")
+    if not index["names"] or not processed:
+        return None, 0, 0
+
+    matches = process.extract(processed, index["names"], scorer=fuzz.ratio, processor=None, limit=2)
+    if not matches:
+        return None, 0, 0
+
+    _, score, idx = matches[0]
+    runner_up = matches[1][1] if len(matches) > 1 else 0
+    return index["apps"][idx], score, runner_up
+
 def find_app(query):
     """
     Fuzzy searches for an app in the registry.
@@ -91,19 +266,68 @@ def find_app(query):
     Returns:
         dict: The best matching app object or None.
     """
-    registry = load_registry()
-    names = [app["name"] for app in registry]
-    
-    # Fuzzy match
-    match = process.extractOne(query, names, scorer=fuzz.token_set_ratio)
-    
-    if match:
-        name, score, idx = match
-        if score > 60:  # Threshold
-            return registry[idx]
-    
+    app, score = match_app(query)
+    if app and score > 60:  # Threshold
+        return app
     return None
 
+# ---------------- WATCHER ----------------
+
+def watch_apps(poll_interval=10.0, debounce=1.0):
+    """
+    Keeps the registry current in the background.
+    Uses inotify on APP_DIRS when inotify_simple is installed, otherwise polls
+    the directories' mtimes. Changes trigger an incremental scan; the
+    in-memory index picks up the rewritten registry via its mtime.
+    Returns: The watcher thread.
+    """
+    target = _watch_inotify if INOTIFY_AVAILABLE else _watch_poll
+    thread = threading.Thread(target=target, args=(poll_interval, debounce), name="app-watcher", daemon=True)
+    thread.start()
+    return thread
+
+def _rescan():
+    try:
+        scan_apps()
+    except Exception as e:
+        print(f"⚠️ App registry rescan failed: {e}")
+
+def _watch_inotify(poll_interval, debounce):
+    inotify = INotify()
+    mask = flags.CREATE | flags.DELETE | flags.MODIFY | flags.MOVED_TO | flags.MOVED_FROM | flags.CLOSE_WRITE
+    for directory in APP_DIRS:
+        if os.path.isdir(directory):
+            inotify.add_watch(directory, mask)
+
+    while True:
+        events = inotify.read()
+        if not any(e.name.endswith(".desktop") for e in events):
+            continue
+        # Package managers touch many files at once; wait for them to settle
+        while inotify.read(timeout=int(debounce * 1000)):
+            pass
+        _rescan()
+
+def _dir_mtimes():
+    mtimes = {}
+    for directory in APP_DIRS:
+        try:
+            mtimes[directory] = os.stat(directory).st_mtime_ns
+        except OSError:
+            mtimes[directory] = None
+    return mtimes
+
+def _watch_poll(poll_interval, debounce):
+    # Adding/removing files bumps the directory mtime
+    last = _dir_mtimes()
+    while True:
+        time.sleep(poll_interval)
+        current = _dir_mtimes()
+        if current != last:
+            time.sleep(debounce)
+            last = _dir_mtimes()
+            _rescan()
+
 if __name__ == "__main__":
-    # If run directly, force a scan
-    scan_apps()
+    # If run directly, force a full scan
+    scan_apps(full=True)
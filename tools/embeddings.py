@@ -0,0 +1,135 @@
+import time
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+import metrics
+
+# ---------------- CONFIG ----------------
+
+EMBED_CACHE_SIZE = 1024
+# How long the batcher waits for more requests before running a forward pass
+BATCH_WINDOW = 0.005  # seconds
+MAX_BATCH = 32
+
+
+def normalize_key(text):
+    return " ".join(text.lower().split())
+
+
+class EmbeddingService:
+    """
+    Caching, micro-batching front end for a SentenceTransformer.
+    - Vectors are kept in an LRU cache keyed on normalized text, so repeated
+      queries (plan repair, multi-step plans) skip the model entirely.
+    - Cache misses go to one batcher thread, which waits BATCH_WINDOW for
+      concurrent requests and encodes them together in one forward pass.
+      Identical in-flight texts share a single slot in the batch.
+    - stats / report() expose hit ratio, batch sizes and encode latency.
+    Callers get copies; the cached vectors themselves are read-only.
+    """
+
+    def __init__(self, model, cache_size=EMBED_CACHE_SIZE, batch_window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.model = model
+        self.cache_size = cache_size
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.stats = {"hits": 0, "misses": 0, "batches": 0, "encoded": 0, "encode_seconds": 0.0}
+
+        self._cache = OrderedDict()
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self._requests = queue.Queue()
+
+        self._thread = threading.Thread(target=self._batcher, name="embed-batcher", daemon=True)
+        self._thread.start()
+
+    # ---- Public API ----
+
+    def encode(self, text):
+        """Returns the embedding of one text (1-D float32 array)."""
+        return self.encode_many([text])[0]
+
+    def encode_many(self, texts):
+        """Returns embeddings for texts, in order (2-D float32 array)."""
+        futures = []
+        with self._lock:
+            for text in texts:
+                key = normalize_key(text)
+                vector = self._cache.get(key)
+                if vector is not None:
+                    self._cache.move_to_end(key)
+                    self.stats["hits"] += 1
+                    futures.append(vector)
+                    continue
+
+                self.stats["misses"] += 1
+                future = self._inflight.get(key)
+                if future is None:
+                    future = Future()
+                    self._inflight[key] = future
+                    self._requests.put((key, text, future))
+                futures.append(future)
+
+        vectors = [f.result() if isinstance(f, Future) else f for f in futures]
+        return np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    def hit_ratio(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def report(self):
+        batches = self.stats["batches"]
+        mean_batch = self.stats["encoded"] / batches if batches else 0.0
+        mean_ms = self.stats["encode_seconds"] * 1000 / batches if batches else 0.0
+        return (
+            f"🧮 Embeddings: hit rate {self.hit_ratio():.1%} "
+            f"({self.stats['hits']} hits, {self.stats['misses']} misses), "
+            f"{batches} batches x {mean_batch:.1f} texts, {mean_ms:.1f} ms per batch"
+        )
+
+    # ---- Internals ----
+
+    def _batcher(self):
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Requests that are already queued never wait for the window
+                    batch.append(self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait())
+                except queue.Empty:
+                    break
+
+            keys = [key for key, _, _ in batch]
+            start = time.perf_counter()
+            try:
+                with metrics.span("embed", batch=len(batch)):
+                    vectors = np.asarray(self.model.encode([text for _, text, _ in batch]), dtype=np.float32)
+            except Exception as e:
+                with self._lock:
+                    for key in keys:
+                        self._inflight.pop(key, None)
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self.stats["batches"] += 1
+                self.stats["encoded"] += len(batch)
+                self.stats["encode_seconds"] += elapsed
+                for key, vector in zip(keys, vectors):
+                    vector.flags.writeable = False
+                    self._cache[key] = vector
+                    self._cache.move_to_end(key)
+                    self._inflight.pop(key, None)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+            for (_, _, future), vector in zip(batch, vectors):
+                future.set_result(vector)
@@ -1,14 +1,51 @@
 from sentence_transformers import SentenceTransformer
-import chromadb
 import os
+import time
+import atexit
+import hashlib
+import threading
 
-# Initialize ChromaDB in a persistent directory
-# This ensures memories survive restart
+from tools.embeddings import EmbeddingService
+from tools.memory_store import ChromaBackend, NumpyBackend, migrate_from_chroma
+from tools.memory_search import MemoryRetriever
+from tools.memory_consolidation import MemoryConsolidator
+
+# Persistent storage, so memories survive restart
 DB_PATH = os.path.join(os.getcwd(), "memory_db")
-client = chromadb.PersistentClient(path=DB_PATH)
 
-# Get or create the collection
-collection = client.get_or_create_collection(name="jarvis_memory")
+# "numpy": memory-mapped in-process index (see tools/memory_store.py)
+# "chroma": the ChromaDB collection in DB_PATH
+MEMORY_BACKEND = "numpy"
+INDEX_PATH = os.path.join(DB_PATH, "index")
+INDEX_DTYPE = "float16"  # or "int8"
+
+
+# Written once the ChromaDB memories have been copied into the NumPy index
+MIGRATED_MARKER = os.path.join(INDEX_PATH, "migrated")
+
+
+def open_store():
+    if MEMORY_BACKEND == "chroma":
+        return ChromaBackend(DB_PATH)
+
+    store = NumpyBackend(INDEX_PATH, dtype=INDEX_DTYPE)
+    if not os.path.exists(MIGRATED_MARKER):
+        # Bring over the Chroma memories; retried on every start until it succeeds
+        try:
+            migrated = migrate_from_chroma(DB_PATH, store)
+        except ImportError:
+            print("⚠️ chromadb not installed, skipping migration of memory_db/chroma.sqlite3")
+            return store
+        except Exception as e:
+            print(f"❌ Memory Error (migration): {e}")
+            return store
+        if migrated:
+            print(f"🧹 Migrated {migrated} memories from ChromaDB")
+        open(MIGRATED_MARKER, "w").close()
+    return store
+
+
+store = open_store()
 
 # Load embedding model (lightweight, runs on CPU/GPU)
 # We load it lazily or globally. Global is fine for now.
@@ -16,6 +53,251 @@ print("🧠 Loading memory embedding model...")
 embedder = SentenceTransformer("nomic-ai/nomic-embed-text-v1", trust_remote_code=True)
 print("✅ Memory model loaded")
 
+# All encode() calls go through here: cached per text, concurrent calls batched
+embeddings = EmbeddingService(embedder)
+
+# New memories are embedded and written in batches: when this many are
+# queued, or FLUSH_INTERVAL seconds after the first one, whichever is first
+WRITE_BATCH_SIZE = 16
+FLUSH_INTERVAL = 2.0
+
+ID_PREFIX = "mem-"
+
+
+def memory_id(text):
+    """
+    Stable content ID. Unlike hash(), which is salted per process, the same
+    fact maps to the same ID in every run, so repeats upsert one record.
+    """
+    key = " ".join(text.lower().split()).rstrip(".!")
+    return ID_PREFIX + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+class MemoryWriter:
+    """
+    Batched, deduplicating writer for the memory store.
+    - A fact is embedded once. Saying it again only refreshes its metadata,
+      so embedding and index cost grow with unique facts.
+    - New facts are queued and a background thread embeds each batch with a
+      single encode() call and upserts it.
+    - Metadata holds real timestamps: created_at, accessed_at (last stored or
+      retrieved) and access_count.
+    - flush() blocks until everything queued has been written; retrieval
+      calls it first so a fact can be recalled right after it was stored.
+    """
+
+    def __init__(self, store, embeddings, batch_size=WRITE_BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.store = store
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = {"stored": 0, "deduplicated": 0, "embedded": 0, "batches": 0}
+
+        self.meta = {}       # id -> metadata of every known memory (incl. queued)
+        self._pending = {}   # id -> text waiting to be embedded
+        self._dirty = set()  # ids whose metadata changed since the last flush
+        self._writing = False
+        self._flush_requested = False
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._load()
+        self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+        self._thread.start()
+
+    # ---- Public API ----
+
+    def add(self, text):
+        """Queues a fact. Returns (id, is_new)."""
+        text = " ".join(text.split())
+        mem_id = memory_id(text)
+        now = time.time()
+
+        with self._cond:
+            meta = self.meta.get(mem_id)
+            if meta is not None:
+                self.stats["deduplicated"] += 1
+                self._touch(mem_id, now)
+                return mem_id, False
+
+            self.meta[mem_id] = {"created_at": now, "accessed_at": now, "access_count": 0}
+            self._pending[mem_id] = text
+            self.stats["stored"] += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+        return mem_id, True
+
+    def touch(self, ids):
+        """Records an access (e.g. a retrieval) of the given memories."""
+        now = time.time()
+        with self._cond:
+            for mem_id in ids:
+                self._touch(mem_id, now)
+
+    def flush(self, timeout=None):
+        """Writes everything queued now. Returns False on timeout."""
+        with self._cond:
+            if not self._pending and not self._dirty and not self._writing:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(
+                lambda: not self._pending and not self._dirty and not self._writing, timeout
+            )
+
+    def forget(self, ids):
+        """Deletes memories (queued ones never get written)."""
+        with self._cond:
+            for mem_id in ids:
+                self.meta.pop(mem_id, None)
+                self._pending.pop(mem_id, None)
+                self._dirty.discard(mem_id)
+        self.store.delete(ids)
+
+    def merge(self, survivor, others):
+        """
+        Folds the metadata of others into survivor and forgets them:
+        earliest created_at, latest accessed_at, summed access_count.
+        """
+        with self._cond:
+            metas = [self.meta[i] for i in [survivor, *others] if i in self.meta]
+            if not metas:
+                return
+            self.meta[survivor] = {
+                "created_at": min(m["created_at"] for m in metas),
+                "accessed_at": max(m["accessed_at"] for m in metas),
+                "access_count": sum(m["access_count"] for m in metas),
+            }
+            if survivor not in self._pending:
+                self._dirty.add(survivor)
+        self.forget(others)
+
+    def snapshot_meta(self):
+        """Returns a consistent copy of the id -> metadata mapping."""
+        with self._cond:
+            return {mem_id: dict(meta) for mem_id, meta in self.meta.items()}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=10)
+
+    # ---- Internals ----
+
+    def _touch(self, mem_id, now):
+        meta = self.meta.get(mem_id)
+        if meta is None:
+            return
+        meta["accessed_at"] = now
+        meta["access_count"] += 1
+        if mem_id not in self._pending:
+            self._dirty.add(mem_id)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or self._flush_requested or len(self._pending) >= self.batch_size,
+                    timeout=self.flush_interval,
+                )
+                pending, self._pending = self._pending, {}
+                metas = {mem_id: dict(self.meta[mem_id]) for mem_id in pending}
+                updates = {mem_id: dict(self.meta[mem_id]) for mem_id in self._dirty}
+                self._dirty = set()
+                self._flush_requested = False
+                self._writing = bool(pending or updates)
+                closed = self._closed
+
+            try:
+                if pending or updates:
+                    self._write(pending, metas, updates)
+            except Exception as e:
+                print(f"❌ Memory Error (flush): {e}")
+                with self._cond:
+                    for mem_id in pending:
+                        self.meta.pop(mem_id, None)
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+
+            if closed:
+                return
+
+    def _write(self, pending, metas, updates):
+        if pending:
+            ids = list(pending)
+            texts = [pending[mem_id] for mem_id in ids]
+            vectors = self.embeddings.encode_many(texts)
+            self.store.upsert(ids, texts, vectors, [metas[mem_id] for mem_id in ids])
+            self.stats["embedded"] += len(ids)
+            self.stats["batches"] += 1
+            print(f"💾 Memory flushed: {len(ids)} new")
+
+        if updates:
+            ids = list(updates)
+            self.store.update_metadata(ids, [updates[mem_id] for mem_id in ids])
+
+    def _load(self):
+        legacy = []
+        for mem_id, text, meta in self.store.load():
+            if mem_id.startswith(ID_PREFIX):
+                self.meta[mem_id] = self._clean_meta(meta)
+            else:
+                legacy.append((mem_id, text, meta))
+
+        if legacy:
+            self._migrate(legacy)
+
+    def _migrate(self, legacy):
+        """Re-keys records stored under hash() IDs, dropping duplicates. Keeps their embeddings."""
+        old_ids = [mem_id for mem_id, _, _ in legacy]
+        vectors = self.store.embeddings(old_ids)
+
+        ids, texts, vecs, metas = [], [], [], []
+        for old_id, text, meta in legacy:
+            mem_id = memory_id(text)
+            if mem_id in self.meta or old_id not in vectors:
+                continue
+            self.meta[mem_id] = self._clean_meta(meta)
+            ids.append(mem_id)
+            texts.append(" ".join(text.split()))
+            vecs.append(vectors[old_id])
+            metas.append(self.meta[mem_id])
+
+        # Write the new records before dropping the old ones, so a crash in
+        # between leaves duplicates (re-keyed on the next start), not a loss
+        if ids:
+            self.store.upsert(ids, texts, vecs, metas)
+        self.store.delete(old_ids)
+        print(f"🧹 Migrated {len(ids)} memories to content IDs ({len(old_ids) - len(ids)} duplicates removed)")
+
+    @staticmethod
+    def _clean_meta(meta):
+        meta = meta or {}
+        now = time.time()
+        created = meta.get("created_at")
+        if not isinstance(created, (int, float)):
+            created = now  # Legacy records only had a dummy timestamp
+        return {
+            "created_at": float(created),
+            "accessed_at": float(meta.get("accessed_at", created)),
+            "access_count": int(meta.get("access_count", 0)),
+        }
+
+
+writer = MemoryWriter(store, embeddings)
+atexit.register(store.close)
+atexit.register(writer.close)  # atexit runs in reverse: flush, then close the store
+
+# BM25 + vector retrieval; queued facts are lexically searchable right away
+retriever = MemoryRetriever(store, embeddings, writer.meta, before_vector=writer.flush)
+
+# Merges near-duplicates and evicts stale memories between wake cycles
+consolidator = MemoryConsolidator(store, writer, retriever)
+atexit.register(consolidator.stop)
+
 def store_memory(text):
     """
     Stores a fact or preference in long-term memory.
@@ -23,19 +305,12 @@ def store_memory(text):
         text (str): The information to remember (e.g., "The user lives in London").
     """
     try:
-        # Generate embedding
-        embedding = embedder.encode(text).tolist()
-        
-        # Simple ID generation (hash of text)
-        mem_id = str(hash(text))
-        
-        collection.add(
-            documents=[text],
-            embeddings=[embedding],
-            ids=[mem_id],
-            metadatas=[{"timestamp": str(os.path.getmtime("."))}] # Dummy metadata
-        )
-        print(f"💾 Memory stored: {text}")
+        mem_id, is_new = writer.add(text)
+        if is_new:
+            retriever.index(mem_id, " ".join(text.split()))
+            print(f"💾 Memory queued: {text}")
+        else:
+            print(f"💾 Memory already known: {text}")
         return True
     except Exception as e:
         print(f"❌ Memory Error (store): {e}")
@@ -48,17 +323,13 @@ def retrieve_memory(query):
         query (str): The search query (e.g., "Where does the user live?").
     """
     try:
-        embedding = embedder.encode(query).tolist()
-        
-        results = collection.query(
-            query_embeddings=[embedding],
-            n_results=3  # Get top 3 most relevant memories
-        )
-        
-        memories = results["documents"][0]
+        hits = retriever.search(query, k=3)  # Get top 3 most relevant memories
+
+        memories = [text for _, text, _ in hits]
         if not memories:
             return "No relevant memories found."
-            
+
+        writer.touch([mem_id for mem_id, _, _ in hits])
         print(f"🔍 Memory retrieved: {memories}")
         return "\n".join(f"- {mem}" for mem in memories)
     except Exception as e:
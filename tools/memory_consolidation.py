@@ -0,0 +1,160 @@
+import time
+import threading
+
+# ---------------- CONFIG ----------------
+
+# Memories at least this similar are treated as the same fact
+DUPLICATE_SIMILARITY = 0.90
+NEIGHBORS = 5
+
+# Evict memories not retrieved or restated for this long (None keeps them)
+MEMORY_TTL = 365 * 24 * 3600  # seconds
+# Above this size the least recently used memories are evicted
+MEMORY_MAX_ENTRIES = 5000
+
+# Memories checked per step; the job yields between steps
+STEP_SIZE = 32
+# Minimum time between the end of one full pass and the start of the next
+PASS_INTERVAL = 3600  # seconds
+
+# Compact the NumPy index once this share of its slots is deleted
+COMPACT_DEAD_RATIO = 0.5
+
+
+class MemoryConsolidator:
+    """
+    Incremental clean-up of the memory store, meant to run while Jarvis is
+    waiting for the wake word.
+    A pass walks every memory in steps of STEP_SIZE, newest first:
+    - Near-duplicates (cosine >= DUPLICATE_SIMILARITY) are merged. The newest
+      wording supersedes the older ones ("I live in London now" replaces
+      "user lives in London"); the survivor keeps the combined metadata.
+    - Memories not accessed within ttl are evicted.
+    At the end of a pass, the least recently used memories are evicted until
+    the store fits max_entries, and the size before/after is reported.
+    start() runs steps on a background thread until the pass is finished or
+    stop() is called; the next start() resumes where it stopped.
+    """
+
+    def __init__(self, store, writer, retriever, ttl=MEMORY_TTL, max_entries=MEMORY_MAX_ENTRIES,
+                 interval=PASS_INTERVAL, step_size=STEP_SIZE):
+        self.store = store
+        self.writer = writer
+        self.retriever = retriever
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.interval = interval
+        self.step_size = step_size
+
+        self._queue = None  # ids still to check in the current pass
+        self._pass = None   # counters of the current pass
+        self._last_pass = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- Public API ----
+
+    def start(self):
+        """Continues (or begins) a pass in the background."""
+        if self._thread and self._thread.is_alive():
+            return
+        if self._queue is None and time.time() - self._last_pass < self.interval:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="memory-consolidate", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Pauses after the current step."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def run_pass(self):
+        """Runs a whole pass in the foreground. Returns the report line."""
+        self._begin()
+        while self._queue:
+            self._step()
+        return self._finish()
+
+    # ---- Internals ----
+
+    def _run(self):
+        try:
+            if self._queue is None:
+                self._begin()
+            while self._queue and not self._stop.is_set():
+                self._step()
+            if self._queue is not None and not self._queue:
+                print(self._finish())
+        except Exception as e:
+            print(f"❌ Memory Error (consolidation): {e}")
+            self._queue = None
+            self._last_pass = time.time()
+
+    def _begin(self):
+        # Queued facts have to be in the store to be compared
+        self.writer.flush()
+        metas = self.writer.snapshot_meta()
+        self._queue = sorted(metas, key=lambda mem_id: metas[mem_id]["created_at"])  # pop() = newest
+        self._pass = {"before": self.store.count(), "merged": 0, "expired": 0, "evicted": 0}
+
+    def _step(self):
+        now = time.time()
+        for _ in range(min(self.step_size, len(self._queue))):
+            mem_id = self._queue.pop()
+            meta = self.writer.meta.get(mem_id)
+            if meta is None:
+                continue  # Already merged away
+
+            if self.ttl and now - meta["accessed_at"] > self.ttl:
+                self._forget([mem_id])
+                self._pass["expired"] += 1
+                continue
+
+            vector = self.store.embeddings([mem_id]).get(mem_id)
+            if vector is None:
+                continue
+
+            group = [mem_id] + [
+                other for other, _, _, score in self.store.search(vector, NEIGHBORS)
+                if other != mem_id and other in self.writer.meta and score >= DUPLICATE_SIMILARITY
+            ]
+            if len(group) > 1:
+                self._merge(group)
+
+    def _merge(self, group):
+        survivor = max(group, key=lambda mem_id: self.writer.meta[mem_id]["created_at"])
+        others = [mem_id for mem_id in group if mem_id != survivor]
+        self.writer.merge(survivor, others)
+        for mem_id in others:
+            self.retriever.remove(mem_id)
+        self._pass["merged"] += len(others)
+
+    def _forget(self, ids):
+        self.writer.forget(ids)
+        for mem_id in ids:
+            self.retriever.remove(mem_id)
+
+    def _finish(self):
+        excess = self.store.count() - self.max_entries
+        if excess > 0:
+            metas = self.writer.snapshot_meta()
+            stale = sorted(metas, key=lambda mem_id: (metas[mem_id]["accessed_at"], metas[mem_id]["access_count"]))
+            self._forget(stale[:excess])
+            self._pass["evicted"] += excess
+
+        # Flush merged metadata, then reclaim deleted slots
+        self.writer.flush()
+        dead = getattr(self.store, "next_slot", 0) - self.store.count()
+        if hasattr(self.store, "compact") and dead > COMPACT_DEAD_RATIO * max(1, self.store.next_slot):
+            self.store.compact()
+
+        stats = self._pass
+        self._queue = None
+        self._pass = None
+        self._last_pass = time.time()
+        return (
+            f"🧹 Memory consolidation: {stats['before']} -> {self.store.count()} memories "
+            f"({stats['merged']} merged, {stats['expired']} expired, {stats['evicted']} evicted)"
+        )
@@ -0,0 +1,222 @@
+import re
+import math
+import time
+import threading
+from collections import Counter
+
+import numpy as np
+
+import metrics
+from tools.memory_store import unit
+
+# ---------------- CONFIG ----------------
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Fused relevance = VECTOR_WEIGHT * cosine + LEXICAL_WEIGHT * normalized BM25.
+# A memory is returned if its cosine alone reaches MIN_COSINE (a paraphrase
+# sharing no words with the query), or if its fused relevance reaches
+# MIN_RELEVANCE (word matches backed by a weaker cosine). A single fused
+# cutoff would need cosine >= MIN_RELEVANCE / VECTOR_WEIGHT (~0.64) from
+# pure paraphrases and drop most of them. MIN_COSINE suits
+# nomic-embed-text-v1, where unrelated facts mostly stay below 0.5;
+# retune it with the embedding model.
+VECTOR_WEIGHT = 0.7
+LEXICAL_WEIGHT = 0.3
+MIN_RELEVANCE = 0.45
+MIN_COSINE = 0.5
+VECTOR_CANDIDATES = 20
+
+# Lexical short-circuit: the best document covers every informative query
+# term and clearly beats the runner-up, so no embedding is computed. Other
+# documents covering the whole query are returned with it (up to k)
+SHORTCUT_COVERAGE = 0.99
+SHORTCUT_MARGIN = 1.5
+
+# Ranking boost for recently and frequently used memories (relevance is
+# multiplied by up to 1 + RECENCY_WEIGHT + FREQUENCY_WEIGHT)
+RECENCY_WEIGHT = 0.2
+RECENCY_HALF_LIFE = 30 * 24 * 3600  # seconds
+FREQUENCY_WEIGHT = 0.1
+FREQUENCY_SATURATION = 20  # accesses for the full frequency boost
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "am", "do", "does", "did",
+    "i", "me", "my", "you", "your", "we", "our", "he", "she", "it", "its", "they", "their",
+    "what", "whats", "who", "whom", "which", "where", "when", "why", "how",
+    "of", "to", "in", "on", "at", "for", "with", "about", "and", "or", "that", "this",
+    "remember", "know", "tell", "can", "could", "please",
+}
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    words = TOKEN.findall(text.lower().replace("'s", "").replace("'", ""))
+    # Plural/3rd-person "s" only: "lives" and "live" match, nothing fancier
+    return [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+            for w in words if w not in STOPWORDS]
+
+
+class LexicalIndex:
+    """Incremental inverted index with BM25 scoring."""
+
+    def __init__(self):
+        self.postings = {}  # term -> {id: term frequency}
+        self.lengths = {}   # id -> document length in tokens
+        self.total_length = 0
+
+    def add(self, mem_id, text):
+        self.remove(mem_id)
+        tokens = tokenize(text)
+        for term, tf in Counter(tokens).items():
+            self.postings.setdefault(term, {})[mem_id] = tf
+        self.lengths[mem_id] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, mem_id):
+        length = self.lengths.pop(mem_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in list(self.postings):
+            docs = self.postings[term]
+            if docs.pop(mem_id, None) is not None and not docs:
+                del self.postings[term]
+
+    def idf(self, term):
+        n = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.lengths) - n + 0.5) / (n + 0.5))
+
+    def search(self, query):
+        """
+        Returns {id: (bm25, coverage)}, where coverage is the share of the
+        query's IDF weight that the document contains.
+        """
+        terms = set(tokenize(query))
+        if not terms or not self.lengths:
+            return {}
+
+        idfs = {term: self.idf(term) for term in terms}
+        total_idf = sum(idfs.values()) or 1.0
+        avg_length = self.total_length / len(self.lengths) or 1.0
+
+        scores = {}
+        for term in terms:
+            for mem_id, tf in self.postings.get(term, {}).items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[mem_id] / avg_length)
+                bm25, covered = scores.get(mem_id, (0.0, 0.0))
+                scores[mem_id] = (bm25 + idfs[term] * tf * (BM25_K1 + 1) / (tf + norm), covered + idfs[term])
+
+        return {mem_id: (bm25, covered / total_idf) for mem_id, (bm25, covered) in scores.items()}
+
+
+class MemoryRetriever:
+    """
+    Hybrid memory retrieval.
+    1. BM25 over an in-memory inverted index. If the best match covers the
+       whole query and clearly beats the rest, it is returned without
+       computing an embedding (exact-name lookups).
+    2. Otherwise the query is embedded, the store's nearest neighbours are
+       fused with the lexical scores, and anything below both MIN_COSINE
+       and MIN_RELEVANCE is dropped.
+    3. Results are ranked by relevance boosted by recency (accessed_at) and
+       access_count.
+    - meta: id -> metadata mapping with created_at/accessed_at/access_count.
+    - before_vector(): called before vector search, e.g. to flush pending writes.
+    """
+
+    def __init__(self, store, embeddings, meta, before_vector=None):
+        self.store = store
+        self.embeddings = embeddings
+        self.meta = meta
+        self.before_vector = before_vector
+        self.lexical = LexicalIndex()
+        self.texts = {}
+        self.stats = {"queries": 0, "lexical_only": 0, "vector": 0, "empty": 0}
+        self._lock = threading.Lock()
+
+        for mem_id, text, _ in store.load():
+            self.index(mem_id, text)
+
+    def index(self, mem_id, text):
+        with self._lock:
+            self.texts[mem_id] = text
+            self.lexical.add(mem_id, text)
+
+    def remove(self, mem_id):
+        with self._lock:
+            self.texts.pop(mem_id, None)
+            self.lexical.remove(mem_id)
+
+    def search(self, query, k=3):
+        """Returns [(id, text, score)] best first, at most k."""
+        self.stats["queries"] += 1
+        with metrics.span("memory.search") as span:
+            with self._lock:
+                lexical = self.lexical.search(query)
+
+            shortcut = self._lexical_shortcut(lexical, k)
+            span.set(lexical_only=bool(shortcut))
+            if shortcut:
+                self.stats["lexical_only"] += 1
+                return self._rank(shortcut, k)
+
+            self.stats["vector"] += 1
+            if self.before_vector:
+                self.before_vector()
+            query_vector = self.embeddings.encode(query)
+
+            cosines = {mem_id: score for mem_id, _, _, score in self.store.search(query_vector, VECTOR_CANDIDATES)}
+            # Lexical hits outside the vector candidates still need a cosine
+            missing = [mem_id for mem_id in lexical if mem_id not in cosines]
+            if missing:
+                vectors = self.store.embeddings(missing)
+                if vectors:
+                    ids = list(vectors)
+                    sims = unit(np.stack([vectors[i] for i in ids])) @ unit(query_vector)[0]
+                    cosines.update(zip(ids, (float(s) for s in sims)))
+
+            top_bm25 = max((bm25 for bm25, _ in lexical.values()), default=0.0) or 1.0
+            relevance = {}
+            for mem_id, cosine in cosines.items():
+                bm25 = lexical.get(mem_id, (0.0, 0.0))[0]
+                score = VECTOR_WEIGHT * cosine + LEXICAL_WEIGHT * bm25 / top_bm25
+                if score >= MIN_RELEVANCE or cosine >= MIN_COSINE:
+                    relevance[mem_id] = score
+
+            results = self._rank(relevance, k)
+            if not results:
+                self.stats["empty"] += 1
+            return results
+
+    # ---- Internals ----
+
+    def _lexical_shortcut(self, lexical, k):
+        if not lexical:
+            return None
+        ranked = sorted(lexical.items(), key=lambda item: -item[1][0])
+        best_id, (best_bm25, coverage) = ranked[0]
+        runner_up = ranked[1][1][0] if len(ranked) > 1 else 0.0
+        if coverage < SHORTCUT_COVERAGE or best_bm25 < SHORTCUT_MARGIN * runner_up:
+            return None
+        # Partial matches need the vector path to judge them
+        return {
+            mem_id: bm25 / best_bm25
+            for mem_id, (bm25, coverage) in ranked[:k]
+            if coverage >= SHORTCUT_COVERAGE
+        }
+
+    def _rank(self, relevance, k):
+        now = time.time()
+        ranked = sorted(relevance.items(), key=lambda item: -item[1] * self._boost(item[0], now))
+        return [(mem_id, self.texts.get(mem_id, ""), score) for mem_id, score in ranked[:k] if mem_id in self.texts]
+
+    def _boost(self, mem_id, now):
+        meta = self.meta.get(mem_id) or {}
+        age = max(0.0, now - meta.get("accessed_at", now))
+        recency = 0.5 ** (age / RECENCY_HALF_LIFE)
+        frequency = min(1.0, math.log1p(meta.get("access_count", 0)) / math.log1p(FREQUENCY_SATURATION))
+        return 1 + RECENCY_WEIGHT * recency + FREQUENCY_WEIGHT * frequency
@@ -0,0 +1,375 @@
+import os
+import abc
+import json
+import threading
+
+import numpy as np
+
+# ---------------- CONFIG ----------------
+
+VECTORS_FILE = "vectors.bin"
+# compact() alternates between the two vectors files
+COMPACT_VECTORS_FILE = "vectors.compact.bin"
+LOG_FILE = "memories.jsonl"
+INITIAL_CAPACITY = 256
+
+# Stored vectors are unit length, so int8 keeps them at a fixed scale
+DTYPES = {"float16": np.float16, "int8": np.int8}
+INT8_SCALE = 127.0
+
+
+def unit(vectors):
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-9)
+
+
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class MemoryBackend(abc.ABC):
+    """
+    Storage interface used by tools.memory.
+    A record is (id, text, metadata, embedding). Metadata values are
+    str/int/float. search() returns [(id, text, metadata, cosine)] best first.
+    """
+
+    @abc.abstractmethod
+    def load(self):
+        """Returns [(id, text, metadata)] for every record."""
+
+    @abc.abstractmethod
+    def embeddings(self, ids):
+        """Returns {id: vector} for the ids that exist."""
+
+    @abc.abstractmethod
+    def upsert(self, ids, texts, embeddings, metadatas):
+        pass
+
+    @abc.abstractmethod
+    def update_metadata(self, ids, metadatas):
+        pass
+
+    @abc.abstractmethod
+    def delete(self, ids):
+        pass
+
+    @abc.abstractmethod
+    def search(self, embedding, k):
+        pass
+
+    @abc.abstractmethod
+    def count(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ChromaBackend(MemoryBackend):
+    """The original ChromaDB PersistentClient collection."""
+
+    def __init__(self, path, name="jarvis_memory"):
+        import chromadb
+
+        self.client = chromadb.PersistentClient(path=path)
+        self.collection = self.client.get_or_create_collection(name=name)
+
+    def load(self):
+        data = self.collection.get(include=["documents", "metadatas"])
+        return list(zip(data["ids"], data["documents"], data["metadatas"]))
+
+    def embeddings(self, ids):
+        data = self.collection.get(ids=list(ids), include=["embeddings"])
+        return {mem_id: np.asarray(vector, dtype=np.float32) for mem_id, vector in zip(data["ids"], data["embeddings"])}
+
+    def upsert(self, ids, texts, embeddings, metadatas):
+        self.collection.upsert(
+            ids=list(ids),
+            documents=list(texts),
+            embeddings=[[float(x) for x in vector] for vector in embeddings],
+            metadatas=list(metadatas),
+        )
+
+    def update_metadata(self, ids, metadatas):
+        self.collection.update(ids=list(ids), metadatas=list(metadatas))
+
+    def delete(self, ids):
+        self.collection.delete(ids=list(ids))
+
+    def search(self, embedding, k):
+        count = self.collection.count()
+        if not count:
+            return []
+        results = self.collection.query(
+            query_embeddings=[[float(x) for x in embedding]],
+            n_results=min(k, count),
+            include=["documents", "metadatas", "embeddings"],
+        )
+        ids = results["ids"][0]
+        scores = unit(results["embeddings"][0]) @ unit(embedding)[0] if ids else []
+        hits = list(zip(ids, results["documents"][0], results["metadatas"][0], (float(s) for s in scores)))
+        return sorted(hits, key=lambda hit: -hit[3])
+
+    def count(self):
+        return self.collection.count()
+
+
+class NumpyBackend(MemoryBackend):
+    """
+    Compact in-process index for a few thousand memories.
+    - Embeddings are unit vectors in a memory-mapped float16 (or int8)
+      matrix, one row per slot; search is one matrix-vector product plus
+      argpartition for the top k.
+    - Texts and metadata live in an append-only JSONL log of put / meta / del
+      operations, replayed on open. compact() rewrites both files without
+      deleted slots.
+    """
+
+    def __init__(self, path, dtype="float16"):
+        self.path = path
+        self.dtype = DTYPES[dtype]
+        self.vectors_path = os.path.join(path, VECTORS_FILE)
+        self.log_path = os.path.join(path, LOG_FILE)
+        os.makedirs(path, exist_ok=True)
+
+        self.dim = None
+        self.records = {}  # id -> {"slot", "text", "meta"}
+        self.slot_ids = {}  # slot -> id
+        self.next_slot = 0
+        self.alive = np.zeros(0, dtype=bool)
+        self.matrix = None
+        self._lock = threading.RLock()
+
+        self._replay()
+        self._log = open(self.log_path, "a", encoding="utf-8")
+
+    # ---- MemoryBackend ----
+
+    def load(self):
+        with self._lock:
+            return [(mem_id, r["text"], dict(r["meta"])) for mem_id, r in self.records.items()]
+
+    def embeddings(self, ids):
+        with self._lock:
+            return {
+                mem_id: self._decode(self.matrix[self.records[mem_id]["slot"]])
+                for mem_id in ids if mem_id in self.records
+            }
+
+    def upsert(self, ids, texts, embeddings, metadatas):
+        vectors = unit(embeddings)
+        with self._lock:
+            if self.dim is None:
+                self._init(vectors.shape[1])
+
+            for mem_id, text, vector, meta in zip(ids, texts, vectors, metadatas):
+                record = self.records.get(mem_id)
+                slot = record["slot"] if record else self._allocate()
+                self.matrix[slot] = self._encode(vector)
+                self.alive[slot] = True
+                self.slot_ids[slot] = mem_id
+                self.records[mem_id] = {"slot": slot, "text": text, "meta": dict(meta)}
+                self._append({"op": "put", "id": mem_id, "slot": slot, "text": text, "meta": meta})
+
+            self.matrix.flush()
+            self._log.flush()
+
+    def update_metadata(self, ids, metadatas):
+        with self._lock:
+            for mem_id, meta in zip(ids, metadatas):
+                if mem_id in self.records:
+                    self.records[mem_id]["meta"] = dict(meta)
+                    self._append({"op": "meta", "id": mem_id, "meta": meta})
+            self._log.flush()
+
+    def delete(self, ids):
+        with self._lock:
+            for mem_id in ids:
+                record = self.records.pop(mem_id, None)
+                if record is not None:
+                    self.alive[record["slot"]] = False
+                    self.slot_ids.pop(record["slot"], None)
+                    self._append({"op": "del", "id": mem_id})
+            self._log.flush()
+
+    def search(self, embedding, k):
+        with self._lock:
+            if not self.records:
+                return []
+            rows = self.matrix[:self.next_slot]
+            scores = self._decode(rows) @ unit(embedding)[0]
+            scores[~self.alive[:self.next_slot]] = -np.inf
+
+            k = min(k, len(self.records))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            hits = []
+            for slot in top:
+                mem_id = self.slot_ids[int(slot)]
+                record = self.records[mem_id]
+                hits.append((mem_id, record["text"], dict(record["meta"]), float(scores[slot])))
+            return hits
+
+    def count(self):
+        return len(self.records)
+
+    def close(self):
+        with self._lock:
+            self._log.close()
+            if self.matrix is not None:
+                self.matrix.flush()
+
+    def compact(self):
+        """
+        Rewrites the matrix and log with only live records.
+        The new matrix goes to a second vectors file and the new log (whose
+        init entry names that file) replaces the old one in a single rename,
+        so a crash at any point leaves one complete, consistent index.
+        """
+        with self._lock:
+            if self.dim is None:
+                return
+            live = list(self.records.items())
+            capacity = INITIAL_CAPACITY
+            while capacity < len(live):
+                capacity *= 2
+
+            old_vectors = self.vectors_path
+            name = VECTORS_FILE if os.path.basename(old_vectors) != VECTORS_FILE else COMPACT_VECTORS_FILE
+            new_vectors = os.path.join(self.path, name)
+            matrix = np.memmap(new_vectors, dtype=self.dtype, mode="w+", shape=(capacity, self.dim))
+            for slot, (_, r) in enumerate(live):
+                matrix[slot] = self.matrix[r["slot"]]
+            matrix.flush()
+            _fsync(new_vectors)
+
+            tmp_path = self.log_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"op": "init", "dim": self.dim, "dtype": np.dtype(self.dtype).name, "vectors": name}) + "\n")
+                for slot, (mem_id, r) in enumerate(live):
+                    f.write(json.dumps({"op": "put", "id": mem_id, "slot": slot, "text": r["text"], "meta": r["meta"]}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._log.close()
+            os.replace(tmp_path, self.log_path)
+            _fsync(self.path)
+
+            self._log = open(self.log_path, "a", encoding="utf-8")
+            self.vectors_path = new_vectors
+            self.matrix = matrix
+            self.records = {mem_id: {"slot": slot, "text": r["text"], "meta": r["meta"]} for slot, (mem_id, r) in enumerate(live)}
+            self.slot_ids = {slot: mem_id for slot, (mem_id, _) in enumerate(live)}
+            self.next_slot = len(live)
+            self.alive = np.zeros(capacity, dtype=bool)
+            self.alive[:len(live)] = True
+
+            try:
+                os.remove(old_vectors)
+            except OSError:
+                pass
+
+    # ---- Internals ----
+
+    def _encode(self, vector):
+        if self.dtype is np.int8:
+            return np.round(vector * INT8_SCALE).astype(np.int8)
+        return vector.astype(self.dtype)
+
+    def _decode(self, rows):
+        rows = np.asarray(rows, dtype=np.float32)
+        return rows / INT8_SCALE if self.dtype is np.int8 else rows
+
+    def _init(self, dim):
+        self.dim = dim
+        self._append({"op": "init", "dim": dim, "dtype": np.dtype(self.dtype).name,
+                      "vectors": os.path.basename(self.vectors_path)})
+        self._open_matrix(INITIAL_CAPACITY)
+
+    def _open_matrix(self, capacity):
+        size = capacity * self.dim * np.dtype(self.dtype).itemsize
+        if self.matrix is not None:
+            self.matrix.flush()
+            self.matrix = None
+        with open(self.vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self.matrix = np.memmap(self.vectors_path, dtype=self.dtype, mode="r+", shape=(capacity, self.dim))
+
+        alive = np.zeros(capacity, dtype=bool)
+        kept = min(capacity, self.alive.size)
+        alive[:kept] = self.alive[:kept]
+        self.alive = alive
+
+    def _allocate(self):
+        if self.next_slot >= self.matrix.shape[0]:
+            self._open_matrix(self.matrix.shape[0] * 2)
+        slot = self.next_slot
+        self.next_slot += 1
+        return slot
+
+    def _append(self, entry):
+        self._log.write(json.dumps(entry) + "\n")
+
+    def _replay(self):
+        if not os.path.exists(self.log_path):
+            return
+
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line after a crash
+                op = entry.get("op")
+                if op == "init":
+                    self.dim = entry["dim"]
+                    self.dtype = DTYPES[entry["dtype"]]
+                    self.vectors_path = os.path.join(self.path, entry.get("vectors", VECTORS_FILE))
+                elif op == "put":
+                    self.records[entry["id"]] = {"slot": entry["slot"], "text": entry["text"], "meta": entry["meta"]}
+                    self.next_slot = max(self.next_slot, entry["slot"] + 1)
+                elif op == "meta" and entry["id"] in self.records:
+                    self.records[entry["id"]]["meta"] = entry["meta"]
+                elif op == "del":
+                    self.records.pop(entry["id"], None)
+
+        if self.dim is None:
+            return
+        capacity = INITIAL_CAPACITY
+        while capacity < self.next_slot:
+            capacity *= 2
+        self._open_matrix(capacity)
+        for mem_id, record in self.records.items():
+            self.alive[record["slot"]] = True
+            self.slot_ids[record["slot"]] = mem_id
+
+
+def migrate_from_chroma(chroma_path, target, name="jarvis_memory"):
+    """
+    Copies every record (with its stored embedding) from a ChromaDB
+    directory into target. IDs are kept as they are. Returns the count.
+    """
+    if not os.path.exists(os.path.join(chroma_path, "chroma.sqlite3")):
+        return 0
+
+    source = ChromaBackend(chroma_path, name)
+    records = source.load()
+    if not records:
+        return 0
+
+    vectors = source.embeddings([mem_id for mem_id, _, _ in records])
+    records = [r for r in records if r[0] in vectors]
+    target.upsert(
+        [mem_id for mem_id, _, _ in records],
+        [text for _, text, _ in records],
+        [vectors[mem_id] for mem_id, _, _ in records],
+        [meta or {} for _, _, meta in records],
+    )
+    return len(records)
@@ -1,30 +1,100 @@
-from tools.apps import open_app
-from tools.system import set_volume, mute_volume, unmute_volume
-from tools.files import list_files, read_file
-from tools.web import open_url, search_web
-from tools.system_info import get_time, get_system_status
-from tools.input import type_text, press_key, hotkey
-from tools.memory import store_memory, retrieve_memory
+import sys
+import time
+import importlib
+import threading
+
+import metrics
+
+# Tool implementations are imported on first use (or by prewarm_tools), so
+# importing the registry doesn't open ChromaDB, load the embedding model or
+# pull in pyautogui/ddgs before the first wake word.
+# name -> (module, function)
+TOOL_SPECS = {
+    "open_app": ("tools.apps", "open_app"),
+    "set_volume": ("tools.system", "set_volume"),
+    "mute": ("tools.system", "mute_volume"),
+    "unmute": ("tools.system", "unmute_volume"),
+    "list_files": ("tools.files", "list_files"),
+    "read_file": ("tools.files", "read_file"),
+    "open_url": ("tools.web", "open_url"),
+    "search_web": ("tools.web", "search_web"),
+    "get_time": ("tools.system_info", "get_time"),
+    "system_status": ("tools.system_info", "get_system_status"),
+    "type_text": ("tools.input", "type_text"),
+    "press_key": ("tools.input", "press_key"),
+    "hotkey": ("tools.input", "hotkey"),
+    "store_memory": ("tools.memory", "store_memory"),
+    "retrieve_memory": ("tools.memory", "retrieve_memory"),
+}
+
+# module -> seconds spent importing it (including its own imports)
+IMPORT_TIMES = {}
+
+def load_tool_module(module_name):
+    """Imports a tool module, recording how long the first import took."""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    IMPORT_TIMES.setdefault(module_name, time.perf_counter() - start)
+    return module
+
+class LazyTool:
+    """Callable placeholder that imports the real tool on first call."""
+
+    def __init__(self, module_name, func_name):
+        self.module_name = module_name
+        self.func_name = func_name
+        self._func = None
+
+    def load(self):
+        if self._func is None:
+            self._func = getattr(load_tool_module(self.module_name), self.func_name)
+        return self._func
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<LazyTool {self.module_name}.{self.func_name}>"
 
 # Master Registry of all available tools
 TOOLS = {
-    "open_app": open_app,
-    "set_volume": set_volume,
-    "mute": mute_volume,
-    "unmute": unmute_volume,
-    "list_files": list_files,
-    "read_file": read_file,
-    "open_url": open_url,
-    "search_web": search_web,
-    "get_time": get_time,
-    "system_status": get_system_status,
-    "type_text": type_text,
-    "press_key": press_key,
-    "hotkey": hotkey,
-    "store_memory": store_memory,
-    "retrieve_memory": retrieve_memory,
+    name: LazyTool(module_name, func_name)
+    for name, (module_name, func_name) in TOOL_SPECS.items()
 }
 
+def prewarm_tools(background=True, report=True):
+    """
+    Imports every tool module ahead of first use.
+    With background=True this runs on a daemon thread and returns it.
+    """
+    def run():
+        for module_name in dict.fromkeys(m for m, _ in TOOL_SPECS.values()):
+            try:
+                load_tool_module(module_name)
+            except Exception as e:
+                print(f"⚠️ Tool module '{module_name}' failed to load: {e}")
+        if report:
+            print(report_import_costs())
+
+    if not background:
+        run()
+        return None
+
+    thread = threading.Thread(target=run, name="tool-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+def report_import_costs():
+    """Per-module import cost, most expensive first."""
+    lines = ["📦 Tool import costs:"]
+    for module_name, seconds in sorted(IMPORT_TIMES.items(), key=lambda kv: -kv[1]):
+        lines.append(f"   {module_name:<20} {seconds * 1000:8.1f} ms")
+    return "\n".join(lines)
+
 def execute_tool_safely(name, args):
     """
     Executes a tool and returns a standardized result dict.
@@ -32,21 +102,28 @@ def execute_tool_safely(name, args):
     """
     func = TOOLS.get(name)
     if not func:
+        metrics.count("unknown_tools")
         return {"status": "error", "error": f"Tool '{name}' not found"}
     
-    try:
-        # Execute the tool
-        result = func(**args)
-        
-        # Normalize the result for the plan executor
-        # Many existing tools return True/False or a string.
-        if result is False:
-            return {"status": "error", "error": "Tool returned False (failed)"}
-        
-        return {"status": "ok", "result": result}
-        
-    except Exception as e:
-        return {"status": "error", "error": str(e)}
+    with metrics.span(f"tool.{name}") as span:
+        try:
+            # Execute the tool
+            result = func(**args)
+            
+            # Normalize the result for the plan executor
+            # Many existing tools return True/False or a string.
+            if result is False:
+                outcome = {"status": "error", "error": "Tool returned False (failed)"}
+            else:
+                outcome = {"status": "ok", "result": result}
+            
+        except Exception as e:
+            outcome = {"status": "error", "error": str(e)}
+
+        span.set(status=outcome["status"])
+    if outcome["status"] == "error":
+        metrics.count("tool_failures")
+    return outcome
 
 # Tool Definitions for System Prompt
 TOOL_DEFINITIONS = """
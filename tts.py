@@ -0,0 +1,487 @@
+import os
+import re
+import json
+import time
+import hashlib
+import wave
+import queue
+import shutil
+import tempfile
+import threading
+import signal
+import subprocess
+
+import metrics
+
+# ---------------- CONFIG ----------------
+
+PIPER_EXE = "./piper_bin/piper/piper"
+PIPER_MODEL = "voices/ryan-med/en_US-ryan-medium.onnx"
+
+DEFAULT_SAMPLE_RATE = 22050
+
+# On-disk cache of synthesized PCM for fixed phrases
+TTS_CACHE_DIR = "tts_cache"
+TTS_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Long responses are split into chunks no longer than this (characters)
+MAX_CHUNK_CHARS = 220
+
+SENTENCE_END = re.compile(r'(?<=[.!?;:])\s+')
+
+# Queue sentinel used to stop the worker threads
+_STOP = object()
+
+
+def split_sentences(text, max_chars=MAX_CHUNK_CHARS):
+    """
+    Splits text into sentence-sized chunks so playback of the first chunk
+    can start while the rest is still being synthesized.
+    """
+    text = " ".join(text.split())
+    chunks = []
+
+    for sentence in SENTENCE_END.split(text):
+        # Hard-wrap run-on sentences on word boundaries
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            chunks.append(sentence)
+
+    return chunks
+
+
+def voice_sample_rate(model_path):
+    """Reads the output sample rate from the voice's .onnx.json config."""
+    try:
+        with open(model_path + ".json", "r") as f:
+            return int(json.load(f)["audio"]["sample_rate"])
+    except (OSError, KeyError, ValueError):
+        return DEFAULT_SAMPLE_RATE
+
+# ---------------- SYNTHESIS ----------------
+
+class PiperProcess:
+    """
+    Keeps a single Piper process alive so the ONNX voice is loaded once.
+    Each stdin line is synthesized to a WAV file in a private directory and
+    Piper prints the file path when it is done, which marks the utterance end.
+    No shell is involved, so quotes in the text cannot break the pipeline.
+    """
+
+    def __init__(self, exe=PIPER_EXE, model=PIPER_MODEL):
+        self.exe = exe
+        self.model = model
+        self.sample_rate = voice_sample_rate(model)
+        self.output_dir = tempfile.mkdtemp(prefix="jarvis_tts_")
+        self.proc = None
+        self.lock = threading.Lock()
+
+        # Start right away so the voice loads before the first utterance
+        try:
+            self.start()
+        except OSError as e:
+            print(f"⚠️ Piper failed to start: {e}")
+
+    def start(self):
+        self.proc = subprocess.Popen(
+            [self.exe, "--model", self.model, "--output_dir", self.output_dir],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1
+        )
+
+    def synthesize(self, text):
+        """Returns raw S16_LE mono PCM for one line of text."""
+        line = " ".join(text.split())
+        if not line:
+            return b""
+
+        with self.lock:
+            if self.proc is None or self.proc.poll() is not None:
+                self.start()
+
+            self.proc.stdin.write(line + "\n")
+            self.proc.stdin.flush()
+            wav_path = self.proc.stdout.readline().strip()
+
+            if not wav_path:
+                raise RuntimeError("Piper exited unexpectedly")
+
+        try:
+            with wave.open(wav_path, "rb") as w:
+                return w.readframes(w.getnframes())
+        finally:
+            os.remove(wav_path)
+
+    def close(self):
+        with self.lock:
+            if self.proc and self.proc.poll() is None:
+                self.proc.stdin.close()
+                try:
+                    self.proc.wait(timeout=2)
+                except subprocess.TimeoutExpired:
+                    self.proc.kill()
+            self.proc = None
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+# ---------------- PHRASE CACHE ----------------
+
+class PhraseCache:
+    """
+    Stores raw PCM for fixed phrases on disk, keyed by (text, voice model).
+    Entries are evicted least-recently-used first (by file mtime, refreshed
+    on every hit) once the directory grows past max_bytes.
+    Pre-warmed phrases are also kept in memory so they play instantly.
+    """
+
+    def __init__(self, model, directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self._hot = {}
+
+        # A retrained/replaced voice file must not reuse old audio
+        try:
+            st = os.stat(model)
+            self.voice_id = f"{os.path.abspath(model)}:{st.st_size}:{int(st.st_mtime)}"
+        except OSError:
+            self.voice_id = os.path.abspath(model)
+
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def normalize(text):
+        return " ".join(text.split())
+
+    def _path(self, text):
+        key = hashlib.sha1(f"{self.voice_id}\0{self.normalize(text)}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + ".pcm")
+
+    def get(self, text):
+        """Returns cached PCM or None."""
+        text = self.normalize(text)
+        pcm = self._hot.get(text)
+        if pcm is not None:
+            return pcm
+
+        path = self._path(text)
+        try:
+            with open(path, "rb") as f:
+                pcm = f.read()
+            os.utime(path)  # Mark as recently used
+            return pcm
+        except OSError:
+            return None
+
+    def put(self, text, pcm, hot=False):
+        if not pcm:
+            return
+        text = self.normalize(text)
+        if hot:
+            self._hot[text] = pcm
+
+        path = self._path(text)
+        tmp_path = path + ".tmp"
+        with self.lock:
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(pcm)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"⚠️ TTS cache write failed: {e}")
+                return
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pcm"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+# ---------------- PLAYBACK ----------------
+
+class AplayPlayer:
+    """Plays raw PCM chunks through aplay (fed via stdin, no shell)."""
+
+    def __init__(self, sample_rate=DEFAULT_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def play(self, pcm, is_current=None):
+        """
+        Plays pcm to the end or until stop().
+        is_current() is checked under the lock right before aplay starts, so
+        a stop() that lands between the caller's own check and here can't
+        be missed (it either sees the process or prevents it).
+        """
+        with self._lock:
+            if is_current and not is_current():
+                return
+            proc = subprocess.Popen(
+                ["aplay", "-q", "-r", str(self.sample_rate), "-f", "S16_LE", "-c", "1", "-t", "raw", "-"],
+                stdin=subprocess.PIPE
+            )
+            self._proc = proc
+        try:
+            proc.communicate(pcm)
+        except BrokenPipeError:
+            pass  # Killed by stop() while we were still writing
+        finally:
+            with self._lock:
+                self._proc = None
+
+        if proc.returncode not in (0, -signal.SIGKILL):
+            raise subprocess.CalledProcessError(proc.returncode, proc.args)
+
+    def stop(self):
+        """Cuts off the chunk that is currently playing."""
+        with self._lock:
+            if self._proc is not None:
+                self._proc.kill()
+
+# ---------------- ENGINE ----------------
+
+class TTSEngine:
+    """
+    Long-lived text-to-speech engine.
+    Text goes through a queue; a synthesis thread turns each sentence into
+    PCM while a playback thread plays the previous one.
+    stop() interrupts playback: every queued item is tagged with the
+    generation it was queued in, and items from older generations are
+    skipped instead of synthesized or played.
+    """
+
+    def __init__(self, synthesizer=None, player=None, cache=None):
+        self.synthesizer = synthesizer or PiperProcess()
+        self.player = player or AplayPlayer(self.synthesizer.sample_rate)
+        self.cache = cache
+
+        self._text_queue = queue.Queue()
+        # Small bound: synthesize at most a couple of sentences ahead
+        self._audio_queue = queue.Queue(maxsize=2)
+
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._last_played = 0.0
+        self.generation = 0
+        self.current_text = None  # Chunk being played right now
+
+        self._threads = [
+            threading.Thread(target=self._synthesis_worker, name="tts-synth", daemon=True),
+            threading.Thread(target=self._playback_worker, name="tts-play", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    # ---- Public API ----
+
+    def say(self, text, cache=False):
+        """
+        Queues text for playback and returns immediately.
+        With cache=True the synthesized audio is stored in the phrase cache.
+        """
+        chunks = split_sentences(text or "")
+        if not chunks:
+            return
+
+        with self._idle:
+            self._pending += len(chunks)
+        for chunk in chunks:
+            self._text_queue.put((chunk, cache, self.generation))
+
+    def speak(self, text, cache=False):
+        """Queues text and blocks until everything queued has been played."""
+        self.say(text, cache)
+        self.wait()
+
+    def prewarm(self, phrases):
+        """Synthesizes fixed phrases into the cache in the background."""
+        if not self.cache:
+            return None
+
+        def run():
+            for phrase in phrases:
+                for chunk in split_sentences(phrase):
+                    pcm = self.cache.get(chunk)
+                    if pcm is None:
+                        try:
+                            pcm = self.synthesizer.synthesize(chunk)
+                        except Exception as e:
+                            print(f"⚠️ TTS prewarm failed for '{chunk}': {e}")
+                            continue
+                    self.cache.put(chunk, pcm, hot=True)
+
+        t = threading.Thread(target=run, name="tts-prewarm", daemon=True)
+        t.start()
+        return t
+
+    def wait(self, timeout=None):
+        """Blocks until the queue is drained. Returns False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def is_speaking(self, tail=0.0):
+        """True while audio is queued/playing, or within `tail` seconds after."""
+        return self._pending > 0 or time.monotonic() - self._last_played < tail
+
+    def stop(self):
+        """
+        Interrupts playback (barge-in): drops everything queued and kills
+        the chunk being played. Returns the new generation.
+        """
+        self.generation += 1
+        stop = getattr(self.player, "stop", None)
+        if stop:
+            stop()
+        return self.generation
+
+    def shutdown(self):
+        self._text_queue.put(_STOP)
+        for t in self._threads:
+            t.join(timeout=2)
+        close = getattr(self.synthesizer, "close", None)
+        if close:
+            close()
+
+    # ---- Workers ----
+
+    def _done(self):
+        with self._idle:
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.notify_all()
+
+    def _synthesis_worker(self):
+        while True:
+            item = self._text_queue.get()
+            if item is _STOP:
+                self._audio_queue.put(_STOP)
+                return
+
+            chunk, cacheable, generation = item
+            if generation != self.generation:
+                self._audio_queue.put((b"", None, generation))
+                continue
+
+            pcm = self.cache.get(chunk) if self.cache else None
+            if pcm is None:
+                try:
+                    with metrics.span("tts.synthesize", chars=len(chunk)):
+                        pcm = self.synthesizer.synthesize(chunk)
+                    if cacheable and self.cache:
+                        self.cache.put(chunk, pcm)
+                except Exception as e:
+                    print(f"❌ TTS Error (synthesis): {e}")
+                    pcm = b""
+            self._audio_queue.put((pcm, chunk, generation))
+
+    def _playback_worker(self):
+        while True:
+            item = self._audio_queue.get()
+            if item is _STOP:
+                return
+
+            pcm, chunk, generation = item
+            try:
+                if pcm and generation == self.generation:
+                    self.current_text = chunk
+                    with metrics.span("tts.play"):
+                        self.player.play(pcm, is_current=lambda: generation == self.generation)
+            except Exception as e:
+                print(f"❌ TTS Error (playback): {e}")
+            finally:
+                self.current_text = None
+                # Interrupted audio stops at once, so no echo tail to wait out
+                if generation == self.generation:
+                    self._last_played = time.monotonic()
+                self._done()
+
+# ---------------- MODULE API ----------------
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Returns the shared engine, starting Piper on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            synthesizer = PiperProcess()
+            _engine = TTSEngine(synthesizer, cache=PhraseCache(synthesizer.model))
+        return _engine
+
+
+def set_engine(engine):
+    """Replaces the shared engine (e.g. with a null sink for benchmarks)."""
+    global _engine
+    with _engine_lock:
+        if _engine is not None and _engine is not engine:
+            _engine.shutdown()
+        _engine = engine
+
+
+def say(text, cache=False):
+    get_engine().say(text, cache)
+
+
+def speak(text, cache=False):
+    get_engine().speak(text, cache)
+
+
+def prewarm(phrases):
+    return get_engine().prewarm(phrases)
+
+
+def is_speaking(tail=0.0):
+    return _engine is not None and _engine.is_speaking(tail)
+
+
+def stop():
+    """Interrupts playback; returns the new generation (see generation())."""
+    return _engine.stop() if _engine is not None else 0
+
+
+def generation():
+    """Increases every time playback is interrupted."""
+    return _engine.generation if _engine is not None else 0
+
+
+def current_text():
+    """The sentence being played right now, or None."""
+    return _engine.current_text if _engine is not None else None
+
+
+def wait(timeout=None):
+    if _engine is None:
+        return True
+    return _engine.wait(timeout)
+
+
+def shutdown():
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.shutdown()
+            _engine = None
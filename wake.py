@@ -2,7 +2,7 @@ import os
 from dotenv import load_dotenv
 import pvporcupine
 from pvrecorder import PvRecorder
-import subprocess
+import tts
 
 # LOAD ENV VARIABLES
 load_dotenv()
@@ -14,17 +14,14 @@ if not ACCESS_KEY:
 
 KEYWORD_PATH = "Jarvis_en_linux_v4_0_0.ppn"
 
-PIPER_EXE = "./piper_bin/piper/piper"
-PIPER_MODEL = "voices/ryan-med/en_US-ryan-medium.onnx"
+WAKE_ACK = "Yes boss"
 
 
-def speak_yes_boss():
-    cmd = (
-        f'echo "Yes boss" | {PIPER_EXE} '
-        f'--model {PIPER_MODEL} --output_raw | '
-        'aplay -r 22050 -f S16_LE -t raw -'
-    )
-    subprocess.run(cmd, shell=True, check=True)
+def speak_yes_boss(wait=True):
+    if wait:
+        tts.speak(WAKE_ACK, cache=True)
+    else:
+        tts.say(WAKE_ACK, cache=True)
 
 
 def init_wake_word_engine():
@@ -35,12 +32,20 @@ def init_wake_word_engine():
     )
 
 
-def wait_for_wake_word(porcupine_instance=None):
+def wait_for_wake_word(porcupine_instance=None, stream=None, on_idle_frame=None):
     """
     Waits for the wake word.
     Args:
         porcupine_instance: An optional pre-initialized Porcupine instance. 
                             If None, a new one is created and destroyed.
+        stream: An optional shared MicrophoneStream (see audio_stream.py).
+                If given, frames are read from its ring buffer instead of
+                opening a new recorder.
+        on_idle_frame: Optional callback given every idle frame (stream mode)
+                       that was not captured during our own playback,
+                       e.g. NoiseFloorEstimator.update.
+    Returns:
+        The ring buffer position right after the wake word (stream mode), else None.
     """
     should_delete = False
     if porcupine_instance is None:
@@ -52,6 +57,37 @@ def wait_for_wake_word(porcupine_instance=None):
     else:
         porcupine = porcupine_instance
 
+    try:
+        if stream is not None:
+            return _wait_on_stream(porcupine, stream, on_idle_frame)
+        _wait_on_recorder(porcupine)
+        return None
+    finally:
+        if should_delete:
+            porcupine.delete()
+
+
+def _wait_on_stream(porcupine, stream, on_idle_frame=None):
+    reader = stream.reader()
+    print("🟢 Listening for 'Jarvis'...")
+
+    while True:
+        pcm = reader.read_frame(timeout=1.0)
+        if pcm is None:
+            if stream.ring.closed:
+                raise RuntimeError("Microphone stream stopped")
+            continue
+        if on_idle_frame and not reader.last_gated:
+            on_idle_frame(pcm)
+        if porcupine.process(pcm) >= 0:
+            print("🟢 Wake word detected")
+            # Don't block: the command may follow in the same breath, and
+            # capture reads it from wake_pos while the acknowledgement plays
+            speak_yes_boss(wait=False)
+            return reader.pos
+
+
+def _wait_on_recorder(porcupine):
     recorder = PvRecorder(
         device_index=-1,
         frame_length=porcupine.frame_length
@@ -71,5 +107,3 @@ def wait_for_wake_word(porcupine_instance=None):
     finally:
         recorder.stop()
         recorder.delete()
-        if should_delete:
-            porcupine.delete()
\ No newline at end of file